@@ -3,16 +3,52 @@ Load CSV data from UAPUFOResearch directory into SQLite database
 """
 import os
 import csv
+import glob
+import time
+import uuid
+import hashlib
 import logging
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
-from typing import Optional
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
 from pathlib import Path
+from sqlalchemy import Column, MetaData, Table, create_engine, delete, insert, select
 from sqlalchemy.orm import Session
-from database import Entity, MoneyFlow, Award, FOIATarget, Relationship
+from database import Entity, MoneyFlow, Award, FOIATarget, Relationship, SourceManifest, EntityMetric, Rollup
+from search import rebuild_search_index
+from services.centrality import GRAPH_TABLES, DEFAULT_BETWEENNESS_SAMPLES, refresh_entity_metrics
+from services.rollups import ROLLUP_TABLES, refresh_rollups
+from services.cube import CUBES, refresh_cube
+
+try:
+    import fcntl
+except ImportError:  # Windows locks files through msvcrt instead
+    fcntl = None
+    import msvcrt
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rows per executemany batch when bulk loading CSV files
+DEFAULT_BATCH_SIZE = 5000
+
+# Seconds between checks on the row counts of tables being staged in worker processes
+PROGRESS_INTERVAL = 0.5
+
+# Seconds between attempts to take the loader lock when waiting for another load
+LOCK_POLL_INTERVAL = 0.5
+
+
+# Version of the dataset in the database, as last committed or seen by this process
+_dataset_version: Optional[str] = None
+
+
+class LoaderBusy(RuntimeError):
+    """Another load of the same database is running"""
+
 
 def parse_date(date_str: Optional[str]) -> Optional[datetime]:
     """Parse date string to datetime object"""
@@ -66,202 +102,508 @@ def infer_entity_type(name: str) -> str:
     return "Organization"
 
 
-def load_entities(db: Session, csv_path: str) -> int:
-    """Load entities from CSV file"""
-    if not os.path.exists(csv_path):
-        logger.warning(f"Entities file not found: {csv_path}")
-        return 0
+def build_entity_row(row: dict) -> dict:
+    """Map an entities CSV row to `entities` column values"""
+    # CSV has 'name' but DB expects 'display_name'
+    name = row.get('name', row.get('display_name', ''))
+    entity_type = row.get('type', row.get('entity_type'))
     
-    count = 0
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                # Map CSV columns to database fields
-                # CSV has 'name' but DB expects 'display_name'
-                name = row.get('name', row.get('display_name', ''))
-                entity_type = row.get('type', row.get('entity_type'))
-                
-                # If type is empty, infer from name
-                if not entity_type or entity_type.strip() == '':
-                    entity_type = infer_entity_type(name)
-                
-                entity = Entity(
-                    entity_id=row.get('entity_id', ''),
-                    display_name=name,
-                    normalized_name=row.get('normalized_name', name.lower() if name else ''),
-                    entity_type=entity_type
-                )
-                db.add(entity)
-                count += 1
-            except Exception as e:
-                logger.error(f"Error loading entity: {e}")
-                continue
+    # If type is empty, infer from name
+    if not entity_type or entity_type.strip() == '':
+        entity_type = infer_entity_type(name)
     
-    db.commit()
-    logger.info(f"Loaded {count} entities")
-    return count
+    return {
+        "entity_id": row.get('entity_id', ''),
+        "display_name": name,
+        "normalized_name": row.get('normalized_name', name.lower() if name else ''),
+        "entity_type": entity_type,
+    }
+
+
+def build_money_flow_row(row: dict) -> dict:
+    """Map a money flows CSV row to `money_flows` column values"""
+    return {
+        "source": row.get('source', ''),
+        "target": row.get('target', ''),
+        "relationship": row.get('relationship'),
+        "amount_usd": parse_float(row.get('amount_usd')),
+        "start_date": parse_date(row.get('start_date')),
+        "end_date": parse_date(row.get('end_date')),
+        "source_citation": row.get('source_citation'),
+        "edge_id": row.get('edge_id'),
+        "source_norm": row.get('source_norm'),
+        "target_norm": row.get('target_norm'),
+    }
+
+
+def build_award_row(row: dict) -> dict:
+    """Map an awards CSV row to `awards` column values"""
+    return {
+        "piid": row.get('piid'),
+        "recipient_name": row.get('recipient_name'),
+        "recipient_uei": row.get('recipient_uei'),
+        "recipient_duns": row.get('recipient_duns'),
+        "awarding_agency": row.get('awarding_agency'),
+        "funding_agency": row.get('funding_agency'),
+        "award_amount": parse_float(row.get('award_amount')),
+        "action_date": parse_date(row.get('action_date')),
+        "description": row.get('description'),
+        "naics_code": row.get('naics_code'),
+        "psc_code": row.get('psc_code'),
+    }
+
+
+def build_foia_target_row(row: dict) -> dict:
+    """Map a FOIA targets CSV row to `foia_targets` column values"""
+    return {
+        "agency": row.get('agency', ''),
+        "record_request": row.get('record_request', ''),
+        "timeframe": row.get('timeframe'),
+        "relevance": row.get('relevance'),
+        "notes": row.get('notes'),
+    }
+
 
+def build_relationship_row(row: dict) -> dict:
+    """Map a relationships CSV row to `relationships` column values"""
+    return {
+        "source": row.get('source', ''),
+        "target": row.get('target', ''),
+        "label": row.get('label', 'RELATED_TO'),
+    }
 
-def load_money_flows(db: Session, csv_path: str) -> int:
-    """Load money flows from CSV file"""
-    if not os.path.exists(csv_path):
-        logger.warning(f"Money flows file not found: {csv_path}")
-        return 0
+
+def iter_csv_rows(csv_path: str, row_builder: Callable[[dict], dict], label: str) -> Iterator[dict]:
+    """Yield column dicts for every parseable row of a CSV file
     
-    count = 0
+    Rows that fail to map are logged and skipped, matching the behaviour
+    of the original per-object loaders.
+    """
     with open(csv_path, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         for row in reader:
             try:
-                money_flow = MoneyFlow(
-                    source=row.get('source', ''),
-                    target=row.get('target', ''),
-                    relationship=row.get('relationship'),
-                    amount_usd=parse_float(row.get('amount_usd')),
-                    start_date=parse_date(row.get('start_date')),
-                    end_date=parse_date(row.get('end_date')),
-                    source_citation=row.get('source_citation'),
-                    edge_id=row.get('edge_id'),
-                    source_norm=row.get('source_norm'),
-                    target_norm=row.get('target_norm')
-                )
-                db.add(money_flow)
-                count += 1
+                yield row_builder(row)
             except Exception as e:
-                logger.error(f"Error loading money flow: {e}")
+                logger.error(f"Error loading {label}: {e}")
                 continue
-    
-    db.commit()
-    logger.info(f"Loaded {count} money flows")
-    return count
 
 
-def load_awards(db: Session, csv_path: str) -> int:
-    """Load awards from CSV file"""
-    if not os.path.exists(csv_path):
-        logger.warning(f"Awards file not found: {csv_path}")
-        return 0
+def iter_batches(rows: Iterable[dict], batch_size: int) -> Iterator[List[dict]]:
+    """Group an iterable of rows into lists of at most `batch_size` rows"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def log_load_rate(label: str, count: int, elapsed: float):
+    """Log how many rows of a table were loaded and at what rate"""
+    rate = count / elapsed if elapsed > 0 else float(count)
+    logger.info(f"Loaded {count} {label} in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+
+
+class DataSource(NamedTuple):
+    """A CSV file under one of the configured data directories and the table it feeds"""
+    table_name: str
+    model: type
+    dir_key: str
+    filename: str
+    row_builder: Callable[[dict], dict]
+    label: str
+
+
+DATA_SOURCES = [
+    DataSource("entities", Entity, "entities_dir", "entities_master.csv", build_entity_row, "entities"),
+    DataSource("money_flows", MoneyFlow, "financial_dir", "money_flows.csv", build_money_flow_row, "money flows"),
+    DataSource("awards", Award, "financial_dir", "awards_master.csv", build_award_row, "awards"),
+    DataSource("foia_targets", FOIATarget, "foia_dir", "foia_targets.csv", build_foia_target_row, "FOIA targets"),
+    DataSource("relationships", Relationship, "entities_dir", "entity_relationships.csv", build_relationship_row, "relationships"),
+]
+
+
+class StagedFile(NamedTuple):
+    """A changed source file and the scratch database it is staged into"""
+    csv_path: str
+    content_hash: str
+    staging_path: str
+    row_count: int
+
+
+def get_source_path(source: DataSource, config: dict, project_root: str = ".") -> str:
+    """Resolve the absolute CSV path for a data source"""
+    return os.path.join(project_root, config['data_sources'][source.dir_key], source.filename)
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_data_source(table_name: str) -> DataSource:
+    """Look up a data source by the name of the table it feeds"""
+    for source in DATA_SOURCES:
+        if source.table_name == table_name:
+            return source
+    raise KeyError(f"Unknown data source table: {table_name}")
+
+
+def staging_path_for(db_path: str, table_name: str, run_id: str) -> str:
+    """Path of the scratch SQLite file a table is staged into before the swap"""
+    return f"{db_path}.staging-{table_name}-{run_id}"
+
+
+def _try_lock_file(f):
+    """Take an exclusive lock on an open file without blocking, raising OSError if it is held"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def loader_lock(db_path: str, wait: bool = False):
+    """Hold the lock that lets only one load of a database run at a time
     
-    count = 0
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                award = Award(
-                    piid=row.get('piid'),
-                    recipient_name=row.get('recipient_name'),
-                    recipient_uei=row.get('recipient_uei'),
-                    recipient_duns=row.get('recipient_duns'),
-                    awarding_agency=row.get('awarding_agency'),
-                    funding_agency=row.get('funding_agency'),
-                    award_amount=parse_float(row.get('award_amount')),
-                    action_date=parse_date(row.get('action_date')),
-                    description=row.get('description'),
-                    naics_code=row.get('naics_code'),
-                    psc_code=row.get('psc_code')
-                )
-                db.add(award)
-                count += 1
-            except Exception as e:
-                logger.error(f"Error loading award: {e}")
-                continue
+    The lock is an OS lock on a file next to the database, so it covers
+    loads in other threads and other processes (e.g. the workers of a
+    multi-worker server) alike, and is released if its holder dies.
     
-    db.commit()
-    logger.info(f"Loaded {count} awards")
-    return count
+    Raises:
+        LoaderBusy: if another load holds the lock and `wait` is False
+    """
+    with open(f"{db_path}.load-lock", "a+") as f:
+        while True:
+            try:
+                _try_lock_file(f)
+                break
+            except OSError:
+                if not wait:
+                    raise LoaderBusy("Another data load is already running")
+                time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            _unlock_file(f)
+
 
+def build_staging_table(model, metadata: MetaData) -> Table:
+    """Index-free copy of a model's table without its primary key column"""
+    return Table(
+        model.__tablename__,
+        metadata,
+        *[Column(c.name, c.type) for c in model.__table__.columns if not c.primary_key],
+    )
 
-def load_foia_targets(db: Session, csv_path: str) -> int:
-    """Load FOIA targets from CSV file"""
-    if not os.path.exists(csv_path):
-        logger.warning(f"FOIA targets file not found: {csv_path}")
-        return 0
+
+def progress_path_for(staging_path: str) -> str:
+    """Path of the file a loader worker reports a table's staged row count in"""
+    return f"{staging_path}.progress"
+
+
+def write_stage_progress(progress_path: str, rows: int):
+    """Record how many rows of a table a worker has staged so far"""
+    tmp_path = f"{progress_path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(rows))
+    os.replace(tmp_path, progress_path)
+
+
+def read_stage_progress(progress_path: str) -> Optional[int]:
+    """Rows staged so far according to a worker's progress file, or None before its first batch"""
+    try:
+        with open(progress_path) as f:
+            return int(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def stage_source_file(
+    table_name: str,
+    csv_path: str,
+    staging_path: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Parse a source CSV into its own scratch SQLite file
     
-    count = 0
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                foia = FOIATarget(
-                    agency=row.get('agency', ''),
-                    record_request=row.get('record_request', ''),
-                    timeframe=row.get('timeframe'),
-                    relevance=row.get('relevance'),
-                    notes=row.get('notes')
-                )
-                db.add(foia)
-                count += 1
-            except Exception as e:
-                logger.error(f"Error loading FOIA target: {e}")
-                continue
+    Runs in a loader worker process. Each table gets a separate file, so
+    workers never contend for the main database's write lock. `progress`
+    is called with the running row count after every batch.
+    """
+    source = get_data_source(table_name)
+    started = time.perf_counter()
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+    
+    engine = create_engine(f"sqlite:///{staging_path}")
+    try:
+        staging = build_staging_table(source.model, MetaData())
+        with engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=OFF")
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            staging.create(conn)
+            count = 0
+            statement = insert(staging)
+            for batch in iter_batches(iter_csv_rows(csv_path, source.row_builder, source.label), batch_size):
+                conn.execute(statement, batch)
+                count += len(batch)
+                if progress is not None:
+                    progress(count)
+    finally:
+        engine.dispose()
     
-    db.commit()
-    logger.info(f"Loaded {count} FOIA targets")
+    log_load_rate(source.label, count, time.perf_counter() - started)
     return count
 
 
-def load_relationships(db: Session, csv_path: str) -> int:
-    """Load relationships from CSV file"""
-    if not os.path.exists(csv_path):
-        logger.warning(f"Relationships file not found: {csv_path}")
-        return 0
+def swap_staged_tables(engine, staged: Dict[str, StagedFile], betweenness_samples: Optional[int] = DEFAULT_BETWEENNESS_SAMPLES):
+    """Replace every staged table's rows and manifest entry in one transaction
     
-    count = 0
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                relationship = Relationship(
-                    source=row.get('source', ''),
-                    target=row.get('target', ''),
-                    label=row.get('label', 'RELATED_TO')
-                )
-                db.add(relationship)
-                count += 1
-            except Exception as e:
-                logger.error(f"Error loading relationship: {e}")
-                continue
-    
-    db.commit()
-    logger.info(f"Loaded {count} relationships")
-    return count
+    Readers see either the previous dataset or the complete new one, never a
+    mix. Tables derived from the data (entity metrics, rollups, cubes) are
+    refreshed on this connection, inside the same transaction, so they never
+    describe a different dataset than the one they sit next to. Staging files
+    are attached for the duration of the swap only.
+    """
+    with engine.connect() as conn:
+        # ATTACH/DETACH are not allowed inside a transaction
+        for table_name, staged_file in staged.items():
+            conn.exec_driver_sql(f"ATTACH DATABASE ? AS staging_{table_name}", (staged_file.staging_path,))
+        conn.commit()
+        try:
+            with conn.begin():
+                manifest = SourceManifest.__table__
+                for table_name, staged_file in staged.items():
+                    source = get_data_source(table_name)
+                    target = source.model.__table__
+                    staging = build_staging_table(source.model, MetaData(schema=f"staging_{table_name}"))
+                    
+                    conn.execute(delete(target))
+                    conn.execute(insert(target).from_select([c.name for c in staging.columns], select(staging)))
+                    rebuild_search_index(conn, table_name)
+                    
+                    conn.execute(delete(manifest).where(manifest.c.table_name == table_name))
+                    conn.execute(insert(manifest).values(
+                        table_name=table_name,
+                        source_path=staged_file.csv_path,
+                        content_hash=staged_file.content_hash,
+                        row_count=staged_file.row_count,
+                        loaded_at=datetime.utcnow(),
+                    ))
+                
+                if GRAPH_TABLES & staged.keys():
+                    refresh_entity_metrics(conn, betweenness_samples)
+                if ROLLUP_TABLES & staged.keys():
+                    refresh_rollups(conn)
+                for fact in CUBES.keys() & staged.keys():
+                    refresh_cube(conn, fact)
+                version = get_dataset_version(conn)
+            set_current_dataset_version(version)
+        finally:
+            for table_name in staged:
+                conn.exec_driver_sql(f"DETACH DATABASE staging_{table_name}")
+            conn.commit()
 
 
-def load_all_data(db: Session, config: dict, project_root: str = "."):
-    """Load all CSV data into database
+def load_changed_data(
+    db: Session,
+    config: dict,
+    project_root: str = ".",
+    force: bool = False,
+    progress: Optional[Callable[..., None]] = None,
+    wait: bool = False,
+) -> Dict[str, int]:
+    """Reload only the tables whose source CSV changed since the last load
+    
+    Changed files are parsed in parallel worker processes, each into its own
+    staging file, and then swapped into the database together. If any table
+    fails to stage, nothing is swapped and the previous data stays in place.
+    Only one load of a database runs at a time (see `loader_lock`).
     
     Args:
         db: Database session
         config: Configuration dictionary
         project_root: Absolute path to project root directory
-    """
-    logger.info("Loading data from refactored structure")
+        force: Reload every table regardless of the manifest
+        progress: Called as `progress(table_name, state, rows)` as each table
+            moves through missing / unchanged / queued / staging / staged /
+            swapping / loaded; `rows` is the row count so far, if known
+        wait: Wait for a load already running to finish instead of raising
     
-    # Load entities
-    entities_path = os.path.join(project_root, config['data_sources']['entities_dir'], "entities_master.csv")
-    load_entities(db, entities_path)
+    Raises:
+        LoaderBusy: if another load is running and `wait` is False
     
-    # Load money flows
-    money_flows_path = os.path.join(project_root, config['data_sources']['financial_dir'], "money_flows.csv")
-    load_money_flows(db, money_flows_path)
+    Returns:
+        Mapping of reloaded table name to its new row count
+    """
+    db_path = db.get_bind().url.database
+    with loader_lock(db_path, wait=wait):
+        # Staging files of a run that died are never picked up again
+        for leftover in glob.glob(f"{glob.escape(db_path)}.staging-*"):
+            os.remove(leftover)
+        return _load_changed_data(db, config, project_root, force, progress)
+
+
+def _load_changed_data(db: Session, config: dict, project_root: str, force: bool, progress) -> Dict[str, int]:
+    """Body of `load_changed_data`, run while holding the loader lock"""
+    report = progress or (lambda table_name, state, rows=None: None)
+    loader_config = config.get('loader', {})
+    batch_size = loader_config.get('batch_size', DEFAULT_BATCH_SIZE)
+    betweenness_samples = config.get('analysis', {}).get('betweenness_samples', DEFAULT_BETWEENNESS_SAMPLES)
+    engine = db.get_bind()
+    db_path = engine.url.database
+    run_id = uuid.uuid4().hex[:8]
+    manifest = {m.table_name: m for m in db.query(SourceManifest).all()}
     
-    # Load awards
-    awards_path = os.path.join(project_root, config['data_sources']['financial_dir'], "awards_master.csv")
-    load_awards(db, awards_path)
+    pending = {}
+    for source in DATA_SOURCES:
+        csv_path = get_source_path(source, config, project_root)
+        if not os.path.exists(csv_path):
+            logger.warning(f"Source file for {source.label} not found: {csv_path}")
+            report(source.table_name, "missing")
+            continue
+        
+        content_hash = hash_file(csv_path)
+        loaded = manifest.get(source.table_name)
+        if not force and loaded is not None and loaded.content_hash == content_hash:
+            logger.info(f"Source for {source.label} unchanged, skipping")
+            report(source.table_name, "unchanged", loaded.row_count)
+            continue
+        
+        pending[source.table_name] = StagedFile(csv_path, content_hash, staging_path_for(db_path, source.table_name, run_id), 0)
+        report(source.table_name, "queued")
+    
+    if not pending:
+        # Databases loaded before metrics, rollups and cubes existed get them computed once
+        if manifest:
+            missing_metrics = db.query(EntityMetric).first() is None
+            missing_rollups = db.query(Rollup).first() is None
+            missing_cubes = [
+                fact for fact, spec in CUBES.items()
+                if fact in manifest and db.query(spec.cube_model).first() is None
+            ]
+            db.commit()
+            if missing_metrics or missing_rollups or missing_cubes:
+                with engine.begin() as conn:
+                    if missing_metrics:
+                        refresh_entity_metrics(conn, betweenness_samples)
+                    if missing_rollups:
+                        refresh_rollups(conn)
+                    for fact in missing_cubes:
+                        refresh_cube(conn, fact)
+        return {}
     
-    # Load FOIA targets
-    foia_path = os.path.join(project_root, config['data_sources']['foia_dir'], "foia_targets.csv")
-    load_foia_targets(db, foia_path)
+    started = time.perf_counter()
+    staged = {}
+    try:
+        workers = min(loader_config.get('workers') or os.cpu_count() or 1, len(pending))
+        if loader_config.get('parallel', True) and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = {}
+                for table_name, p in pending.items():
+                    worker_progress = partial(write_stage_progress, progress_path_for(p.staging_path))
+                    futures[pool.submit(
+                        stage_source_file, table_name, p.csv_path, p.staging_path, batch_size, worker_progress
+                    )] = table_name
+                    report(table_name, "staging", 0)
+                
+                # Workers report row counts through progress files, picked up between completions
+                running = set(futures)
+                while running:
+                    done, running = wait(running, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        table_name = futures[future]
+                        staged[table_name] = pending[table_name]._replace(row_count=future.result())
+                        report(table_name, "staged", staged[table_name].row_count)
+                    for future in running:
+                        table_name = futures[future]
+                        rows = read_stage_progress(progress_path_for(pending[table_name].staging_path))
+                        if rows is not None:
+                            report(table_name, "staging", rows)
+        else:
+            for table_name, p in pending.items():
+                report(table_name, "staging", 0)
+                staged[table_name] = p._replace(row_count=stage_source_file(
+                    table_name, p.csv_path, p.staging_path, batch_size,
+                    partial(report, table_name, "staging"),
+                ))
+                report(table_name, "staged", staged[table_name].row_count)
+        
+        # Let go of the session's connection so the swap can take the write lock
+        db.commit()
+        for table_name, staged_file in staged.items():
+            report(table_name, "swapping", staged_file.row_count)
+        swap_staged_tables(engine, staged, betweenness_samples)
+    finally:
+        for p in pending.values():
+            for path in (p.staging_path, progress_path_for(p.staging_path)):
+                if os.path.exists(path):
+                    os.remove(path)
     
-    # Load relationships
-    relationships_path = os.path.join(project_root, config['data_sources']['entities_dir'], "entity_relationships.csv")
-    load_relationships(db, relationships_path)
+    for table_name, staged_file in staged.items():
+        report(table_name, "loaded", staged_file.row_count)
+    logger.info(f"Swapped in {len(staged)} table(s) in {time.perf_counter() - started:.2f}s")
+    return {table_name: staged_file.row_count for table_name, staged_file in staged.items()}
+
+
+def load_all_data(db: Session, config: dict, project_root: str = "."):
+    """Load all CSV data into database
     
+    Args:
+        db: Database session
+        config: Configuration dictionary
+        project_root: Absolute path to project root directory
+    """
+    logger.info("Loading data from refactored structure")
+    load_changed_data(db, config, project_root, force=True)
     logger.info("Data loading complete")
 
 
-def is_database_populated(db: Session) -> bool:
-    """Check if database already has data"""
-    entity_count = db.query(Entity).count()
-    return entity_count > 0
+def get_dataset_version(db) -> str:
+    """Stamp identifying the dataset loaded in the database, from a Session or Connection
+    
+    Derived from the source manifest, so it changes whenever the loader
+    replaces any table, in this process or another one sharing the file.
+    """
+    digest = hashlib.sha256()
+    manifest = SourceManifest.__table__
+    rows = db.execute(
+        select(manifest.c.table_name, manifest.c.content_hash, manifest.c.row_count, manifest.c.loaded_at)
+        .order_by(manifest.c.table_name)
+    )
+    for table_name, content_hash, row_count, loaded_at in rows:
+        digest.update(f"{table_name}:{content_hash}:{row_count}:{loaded_at}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def set_current_dataset_version(version: Optional[str]):
+    """Record the version of the dataset now in the database (see get_dataset_version)"""
+    global _dataset_version
+    _dataset_version = version
+
+
+def current_dataset_version() -> Optional[str]:
+    """Version of the dataset in the database without querying it, or None if not known yet
+    
+    Set when this process commits a load and when the readiness checks find
+    a dataset or see another process's reload in the load status file.
+    """
+    return _dataset_version
@@ -2,10 +2,15 @@
 Database initialization and management with SQLAlchemy
 """
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, Text, Index
+import sqlite3
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, Date, DateTime, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool
+
+from search import create_search_indexes
 
 
 Base = declarative_base()
@@ -93,30 +98,180 @@ class Relationship(Base):
     )
 
 
+class EntityMetric(Base):
+    """Precomputed centrality and flow totals for each node of the entity graphs"""
+    __tablename__ = "entity_metrics"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    entity_id = Column(String, index=True)
+    degree = Column(Integer, index=True, nullable=False)
+    in_flow = Column(Float, index=True, nullable=False)
+    out_flow = Column(Float, index=True, nullable=False)
+    pagerank = Column(Float, index=True, nullable=False)
+    betweenness = Column(Float, index=True, nullable=False)
+
+
+class Rollup(Base):
+    """Precomputed counts and totals of a data table, grouped along one dimension"""
+    __tablename__ = "rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String, nullable=False)
+    key = Column(String)
+    row_count = Column(Integer, nullable=False)
+    total = Column(Float)
+    min_date = Column(Date)
+    max_date = Column(Date)
+    
+    __table_args__ = (
+        Index('idx_rollup_dimension_key', 'dimension', 'key'),
+        Index('idx_rollup_dimension_total', 'dimension', 'total'),
+    )
+
+
+class AwardCube(Base):
+    """Award counts and amounts pre-aggregated per agency, NAICS, PSC and month"""
+    __tablename__ = "award_cube"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    awarding_agency = Column(String, index=True)
+    funding_agency = Column(String, index=True)
+    naics_code = Column(String, index=True)
+    psc_code = Column(String, index=True)
+    month = Column(String, index=True)  # YYYY-MM of action_date
+    row_count = Column(Integer, nullable=False)
+    amount_count = Column(Integer, nullable=False)
+    total_amount = Column(Float)
+    min_amount = Column(Float)
+    max_amount = Column(Float)
+
+
+class FlowCube(Base):
+    """Money flow counts and amounts pre-aggregated per source, target, relationship and month"""
+    __tablename__ = "flow_cube"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, index=True)
+    target = Column(String, index=True)
+    relationship = Column(String, index=True)
+    month = Column(String, index=True)  # YYYY-MM of start_date
+    row_count = Column(Integer, nullable=False)
+    amount_count = Column(Integer, nullable=False)
+    total_amount = Column(Float)
+    min_amount = Column(Float)
+    max_amount = Column(Float)
+
+
+class SourceManifest(Base):
+    """Content hash and row count of the CSV file each table was loaded from"""
+    __tablename__ = "source_manifest"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String, unique=True, nullable=False)
+    source_path = Column(String, nullable=False)
+    content_hash = Column(String, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    loaded_at = Column(DateTime)
+
+
 # Database connection and session management
 def get_database_url(db_path: str = "data/prh.db") -> str:
     """Get SQLite database URL"""
     return f"sqlite:///{db_path}"
 
 
-def init_database(db_path: str = "data/prh.db"):
-    """Initialize database with tables"""
+# Defaults for the `database.performance` section of config.yaml
+DEFAULT_PERFORMANCE_PROFILE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 268435456,
+    "cache_size": -65536,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+    "read_pool_size": 8,
+}
+
+
+def get_performance_profile(performance: Optional[dict] = None) -> dict:
+    """Merge a configured performance profile over the defaults"""
+    profile = dict(DEFAULT_PERFORMANCE_PROFILE)
+    profile.update({k: v for k, v in (performance or {}).items() if v is not None})
+    return profile
+
+
+def apply_sqlite_pragmas(engine, profile: dict, read_only: bool = False):
+    """Set the profile's pragmas on every new connection of an engine"""
+    
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # journal_mode is persistent in the file and needs write access to change
+        if not read_only:
+            cursor.execute(f"PRAGMA journal_mode={profile['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous={profile['synchronous']}")
+        cursor.execute(f"PRAGMA mmap_size={int(profile['mmap_size'])}")
+        cursor.execute(f"PRAGMA cache_size={int(profile['cache_size'])}")
+        cursor.execute(f"PRAGMA temp_store={profile['temp_store']}")
+        cursor.execute(f"PRAGMA busy_timeout={int(profile['busy_timeout'])}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def init_database(db_path: str = "data/prh.db", performance: Optional[dict] = None):
+    """Initialize database with tables
+    
+    Args:
+        db_path: Path to the SQLite database file
+        performance: `database.performance` section of config.yaml
+    """
     # Ensure data directory exists
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     
     # Create engine
+    profile = get_performance_profile(performance)
     engine = create_engine(
         get_database_url(db_path),
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
+        connect_args={"check_same_thread": False, "timeout": profile["busy_timeout"] / 1000},
     )
+    apply_sqlite_pragmas(engine, profile)
     
     # Create all tables
     Base.metadata.create_all(bind=engine)
+    create_search_indexes(engine)
     
     return engine
 
 
+def init_read_engine(db_path: str = "data/prh.db", performance: Optional[dict] = None):
+    """Create a pool of read-only connections for the GET routes
+    
+    In WAL mode these readers don't block each other or the loader, so
+    concurrent dashboard requests no longer queue behind one connection.
+    """
+    profile = get_performance_profile(performance)
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+    
+    def connect():
+        return sqlite3.connect(
+            uri,
+            uri=True,
+            check_same_thread=False,
+            timeout=profile["busy_timeout"] / 1000,
+        )
+    
+    engine = create_engine(
+        "sqlite://",
+        creator=connect,
+        poolclass=QueuePool,
+        pool_size=int(profile["read_pool_size"]),
+        max_overflow=0,
+    )
+    apply_sqlite_pragmas(engine, profile, read_only=True)
+    return engine
+
+
 def get_session_maker(engine):
     """Get session maker for database operations"""
     return sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -1,13 +1,26 @@
 """
 Shared dependencies for FastAPI routes
 """
-from typing import Generator
+import time
+from contextlib import contextmanager
+from typing import Generator, Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 
 # Global database session maker (will be set by main.py during startup)
 SessionLocal = None
 _db_initialized = False
 
+# Session maker bound to the read-only connection pool, if one is configured
+ReadSessionLocal = None
+
+# Seconds a request's read queries may run before SQLite interrupts them (None = no limit)
+query_timeout = None
+
+# SQLite virtual machine instructions between deadline checks
+DEADLINE_CHECK_INTERVAL = 10000
+
 
 def set_session_local(session_maker):
     """Set the global session maker (called from main.py during startup)"""
@@ -16,6 +29,57 @@ def set_session_local(session_maker):
     _db_initialized = True
 
 
+def set_read_session_local(session_maker):
+    """Set the read-only session maker (called from main.py during startup)"""
+    global ReadSessionLocal
+    ReadSessionLocal = session_maker
+
+
+def set_query_timeout(seconds: Optional[float]):
+    """Set the per-request read query timeout (called from main.py during startup)"""
+    global query_timeout
+    query_timeout = seconds or None
+
+
+@contextmanager
+def query_deadline(db: Session, seconds: Optional[float]) -> Iterator[None]:
+    """Interrupt statements run on the session's connection once `seconds` have passed
+    
+    The session checks out a connection only when it runs its first
+    statement, and the clock starts then too, so a request waiting for a
+    worker thread or a pooled connection doesn't hold one or use up its time.
+    An interrupted statement raises an OperationalError that
+    is_query_interrupted recognizes.
+    """
+    if not seconds:
+        yield
+        return
+    
+    deadline = None
+    connections = []
+    
+    def install(session, transaction, connection):
+        nonlocal deadline
+        if deadline is None:
+            deadline = time.monotonic() + seconds
+        driver_connection = connection.connection.driver_connection
+        driver_connection.set_progress_handler(lambda: time.monotonic() > deadline, DEADLINE_CHECK_INTERVAL)
+        connections.append(driver_connection)
+    
+    event.listen(db, "after_begin", install)
+    try:
+        yield
+    finally:
+        event.remove(db, "after_begin", install)
+        for driver_connection in connections:
+            driver_connection.set_progress_handler(None, 0)
+
+
+def is_query_interrupted(error: OperationalError) -> bool:
+    """Whether a database error came from a query deadline"""
+    return "interrupted" in str(error.orig)
+
+
 def get_db() -> Generator[Session, None, None]:
     """Database dependency for FastAPI routes"""
     if not _db_initialized or SessionLocal is None:
@@ -26,3 +90,31 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+
+def get_read_db() -> Generator[Session, None, None]:
+    """Read-only database dependency for GET routes
+    
+    Falls back to the read-write session maker when no read pool is set up.
+    Queries are interrupted once the request exceeds the query timeout.
+    """
+    if not _db_initialized or SessionLocal is None:
+        raise RuntimeError("Database not initialized")
+    db = (ReadSessionLocal or SessionLocal)()
+    try:
+        with query_deadline(db, query_timeout):
+            yield db
+    finally:
+        db.close()
+
+
+@contextmanager
+def read_session() -> Iterator[Session]:
+    """Read-only session for work that outlives the request's dependencies,
+    such as the body generator of a streaming response"""
+    if not _db_initialized or SessionLocal is None:
+        raise RuntimeError("Database not initialized")
+    db = (ReadSessionLocal or SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,124 @@
+"""
+Filters shared by the data list routes and filtered exports
+"""
+from typing import Callable, Dict, NamedTuple, Optional
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import or_
+
+from database import Entity, MoneyFlow, Award, FOIATarget
+from search import apply_search
+from models.schemas import EntityQueryParams, MoneyFlowQueryParams, AwardQueryParams, FOIATargetQueryParams
+
+
+def filter_entities(query, search: str = None, entity_type: str = None, ranked: bool = True):
+    """Apply the /entities filters to an entities query"""
+    if search:
+        query = apply_search(query, Entity, search, ranked=ranked)
+    
+    if entity_type:
+        query = query.filter(Entity.entity_type == entity_type)
+    
+    return query
+
+
+def filter_money_flows(query, search: str = None, min_amount: float = None, max_amount: float = None, ranked: bool = True):
+    """Apply the /money-flows filters to a money flows query"""
+    if search:
+        query = apply_search(query, MoneyFlow, search, ranked=ranked)
+    
+    if min_amount is not None:
+        query = query.filter(MoneyFlow.amount_usd >= min_amount)
+    
+    if max_amount is not None:
+        query = query.filter(MoneyFlow.amount_usd <= max_amount)
+    
+    return query
+
+
+def filter_awards(
+    query,
+    search: str = None,
+    agency: str = None,
+    min_amount: float = None,
+    max_amount: float = None,
+    naics_code: str = None,
+    ranked: bool = True,
+):
+    """Apply the /awards filters to an awards query"""
+    if search:
+        query = apply_search(query, Award, search, ranked=ranked)
+    
+    if agency:
+        query = query.filter(
+            or_(
+                Award.awarding_agency.ilike(f"%{agency}%"),
+                Award.funding_agency.ilike(f"%{agency}%")
+            )
+        )
+    
+    if min_amount is not None:
+        query = query.filter(Award.award_amount >= min_amount)
+    
+    if max_amount is not None:
+        query = query.filter(Award.award_amount <= max_amount)
+    
+    if naics_code:
+        query = query.filter(Award.naics_code == naics_code)
+    
+    return query
+
+
+def filter_foia_targets(query, search: str = None, agency: str = None, ranked: bool = True):
+    """Apply the /foia-targets filters to a FOIA targets query"""
+    if search:
+        query = apply_search(query, FOIATarget, search, ranked=ranked)
+    
+    if agency:
+        query = query.filter(FOIATarget.agency.ilike(f"%{agency}%"))
+    
+    return query
+
+
+class DataFilter(NamedTuple):
+    """Filter function of a data type and the query params model validating its inputs"""
+    apply: Callable
+    params: type
+    fields: tuple
+
+
+DATA_FILTERS: Dict[str, DataFilter] = {
+    "entities": DataFilter(filter_entities, EntityQueryParams, ("search", "entity_type")),
+    "money_flows": DataFilter(filter_money_flows, MoneyFlowQueryParams, ("search", "min_amount", "max_amount")),
+    "awards": DataFilter(
+        filter_awards, AwardQueryParams, ("search", "agency", "min_amount", "max_amount", "naics_code")
+    ),
+    "foia_targets": DataFilter(filter_foia_targets, FOIATargetQueryParams, ("search", "agency")),
+}
+
+
+def validate_filters(data_type: str, filters: Optional[dict]) -> dict:
+    """Check a filters dict against the list route's parameters for a data type
+    
+    Raises:
+        ValueError: On unknown filter names or values of the wrong type
+    """
+    data_filter = DATA_FILTERS[data_type]
+    filters = filters or {}
+    
+    unknown = set(filters) - set(data_filter.fields)
+    if unknown:
+        raise ValueError(
+            f"Unknown {data_type} filter(s): {', '.join(sorted(unknown))}; "
+            f"expected: {', '.join(data_filter.fields)}"
+        )
+    
+    try:
+        params: BaseModel = data_filter.params.model_validate(filters)
+    except ValidationError as e:
+        raise ValueError(f"Invalid {data_type} filters: {e}")
+    return params.model_dump(include=set(data_filter.fields), exclude_none=True)
+
+
+def apply_filters(query, data_type: str, filters: Optional[dict], ranked: bool = True):
+    """Apply validated list-route filters for a data type to a query"""
+    return DATA_FILTERS[data_type].apply(query, ranked=ranked, **(filters or {}))
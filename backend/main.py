@@ -3,18 +3,28 @@ Project RawHorse - FastAPI Backend
 Main application entry point
 """
 import os
+import threading
 import webbrowser
 import yaml
-from fastapi import FastAPI
+import anyio.to_thread
+from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from contextlib import asynccontextmanager
+from sqlalchemy.exc import OperationalError
 import logging
 
-from database import init_database, get_session_maker
-from data_loader import load_all_data, is_database_populated
-from dependencies import set_session_local, get_db
+from database import init_database, init_read_engine, get_session_maker
+from sqlalchemy.orm import Session
+
+from data_loader import LoaderBusy, load_changed_data
+from services.graph_index import get_graph_index, invalidate_graph_index
+from services.export_jobs import ExportJobManager, set_job_manager
+from services.export_cache import ExportCache, set_export_cache
+from dependencies import set_session_local, set_read_session_local, set_query_timeout, is_query_interrupted, get_db
+from response_cache import ResponseCacheMiddleware
+from readiness import ReadinessMiddleware, get_load_status, not_ready_response, status_path_for, DEFAULT_RETRY_AFTER
 from routers import data, analysis, export_router, contribute
 
 logging.basicConfig(level=logging.INFO)
@@ -28,6 +38,67 @@ config_path = os.path.join(PROJECT_ROOT, "config.yaml")
 with open(config_path, "r") as f:
     config = yaml.safe_load(f)
 
+# Set for uvicorn worker processes when a parent process initializes and
+# loads the database for them (see run_server)
+SERVE_ONLY_ENV = "UAP_SERVE_ONLY"
+
+
+def get_db_path() -> str:
+    """Database file path, resolved relative to the project root"""
+    return os.path.join(PROJECT_ROOT, config['database']['path'])
+
+
+def prepare_database(engine):
+    """Load changed source files on behalf of the worker processes
+    
+    Progress is recorded in this process's load status, which run_server
+    has it publish for the workers' /api/ready.
+    """
+    status = get_load_status()
+    db = get_session_maker(engine)()
+    try:
+        reloaded = load_changed_data(db, config, PROJECT_ROOT, progress=status.update_table, wait=True)
+        if reloaded:
+            logger.info(f"Reloaded tables: {', '.join(reloaded)}")
+        else:
+            logger.info("Database up to date with source files")
+        status.finish()
+    except Exception as e:
+        logger.exception("Loading data failed")
+        status.fail(e)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def load_in_background(session_maker, browser_url: str = None):
+    """Load changed source files and warm the graph index, recording progress for /api/ready
+    
+    Opens `browser_url` once the data is ready, if given.
+    """
+    status = get_load_status()
+    status.start()
+    db = session_maker()
+    try:
+        reloaded = load_changed_data(db, config, PROJECT_ROOT, progress=status.update_table, wait=True)
+        if reloaded:
+            logger.info(f"Reloaded tables: {', '.join(reloaded)}")
+        else:
+            logger.info("Database up to date with source files")
+        
+        # Build the graph index up front so the first graph request is fast
+        get_graph_index(db)
+        status.finish()
+        
+        if browser_url:
+            logger.info(f"Opening browser at {browser_url}")
+            webbrowser.open(browser_url)
+    except Exception as e:
+        logger.exception("Loading data failed")
+        status.fail(e)
+    finally:
+        db.close()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -35,36 +106,84 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Project RawHorse...")
     
+    # Routes run their blocking database work in a bounded pool of worker threads
+    concurrency = config.get('concurrency') or {}
+    if concurrency.get('thread_pool_size'):
+        anyio.to_thread.current_default_thread_limiter().total_tokens = concurrency['thread_pool_size']
+    set_query_timeout((concurrency.get('query_timeout_ms') or 0) / 1000)
+    
+    # Workers started by run_server leave loading to the parent process
+    serve_only = os.environ.get(SERVE_ONLY_ENV) == "1"
+    
     # Initialize database (resolve path relative to project root)
-    db_path = os.path.join(PROJECT_ROOT, config['database']['path'])
-    engine = init_database(db_path)
+    db_path = get_db_path()
+    performance = config['database'].get('performance')
+    engine = init_database(db_path, performance)
     session_maker = get_session_maker(engine)
     
     # Set the session maker in dependencies module
     set_session_local(session_maker)
     
-    # Load data if database is empty
-    db = session_maker()
-    try:
-        if not is_database_populated(db):
-            logger.info("Database is empty, loading data...")
-            load_all_data(db, config, PROJECT_ROOT)
-        else:
-            logger.info("Database already populated")
-    finally:
-        db.close()
+    # GET routes read through a separate pool of read-only connections
+    read_engine = None
+    read_pool_size = (performance or {}).get('read_pool_size', 0)
+    if read_pool_size:
+        # Every worker thread must be able to hold a read connection at once, or
+        # threads block on the pool while the requests holding connections wait
+        # for a thread to run their queries on
+        thread_pool_size = anyio.to_thread.current_default_thread_limiter().total_tokens
+        if int(read_pool_size) < thread_pool_size:
+            raise ValueError(
+                f"database.performance.read_pool_size ({read_pool_size}) must be at least "
+                f"concurrency.thread_pool_size ({thread_pool_size})"
+            )
+        read_engine = init_read_engine(db_path, performance)
+        set_read_session_local(get_session_maker(read_engine))
     
-    # Auto-open browser if configured
-    if config['server']['auto_open_browser']:
-        port = config['server']['port_range'][0]
-        url = f"http://{config['server']['host']}:{port}"
-        logger.info(f"Opening browser at {url}")
-        webbrowser.open(url)
+    # Load any tables whose source CSVs are new or changed in the background, so
+    # the server accepts connections right away; until a dataset is in place the
+    # data routes answer 503 (see ReadinessMiddleware)
+    status = get_load_status()
+    status.refresh(force=True)
+    if serve_only:
+        status.serve_only(status_path_for(db_path))
+    else:
+        # Auto-open browser if configured
+        browser_url = None
+        if config['server']['auto_open_browser']:
+            browser_url = f"http://{config['server']['host']}:{config['server']['port_range'][0]}"
+        threading.Thread(
+            target=load_in_background, args=(session_maker, browser_url), name="data-loader", daemon=True
+        ).start()
+    
+    # Worker processes for background export jobs
+    exports_config = config.get('exports') or {}
+    job_manager = ExportJobManager(
+        os.path.join(PROJECT_ROOT, exports_config.get('jobs_dir', 'data/exports')),
+        db_path,
+        performance,
+        workers=exports_config.get('job_workers', 2),
+        retention_minutes=exports_config.get('job_retention_minutes', 60),
+    )
+    set_job_manager(job_manager)
+    
+    # Cache of generated exports, reused until the data changes
+    if exports_config.get('cache_max_mb', 512):
+        set_export_cache(ExportCache(
+            os.path.join(PROJECT_ROOT, exports_config.get('cache_dir', 'data/exports/cache')),
+            max_mb=exports_config.get('cache_max_mb', 512),
+            use_gzip=exports_config.get('cache_gzip', True),
+        ))
     
     yield
     
     # Shutdown
     logger.info("Shutting down Project RawHorse...")
+    set_job_manager(None)
+    job_manager.shutdown()
+    if read_engine is not None:
+        read_engine.dispose()
+    engine.dispose()
 
 
 # Create FastAPI app
@@ -75,6 +194,21 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Cache GET responses of the read-only routes until the data changes
+http_cache_config = config.get('http_cache') or {}
+if http_cache_config.get('enabled', True):
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        max_mb=http_cache_config.get('max_mb', 64),
+        max_entry_kb=http_cache_config.get('max_entry_kb', 2048),
+    )
+
+# Data routes answer 503 until the startup load has committed a dataset
+app.add_middleware(
+    ReadinessMiddleware,
+    retry_after=config['server'].get('retry_after', DEFAULT_RETRY_AFTER),
+)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -82,6 +216,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -90,12 +225,50 @@ app.include_router(analysis.router, prefix="/api/analysis", tags=["analysis"])
 app.include_router(export_router.router, prefix="/api/export", tags=["export"])
 app.include_router(contribute.router, prefix="/api/contribute", tags=["contribute"])
 
+@app.exception_handler(OperationalError)
+async def database_error_handler(request, exc: OperationalError):
+    """Report queries stopped by the per-request query timeout as 504s, other database errors as 500s
+    
+    Only routes reading through get_read_db have a query deadline; the
+    export and streaming routes open read_session() without one, so their
+    database errors are never 504s.
+    """
+    if is_query_interrupted(exc):
+        return JSONResponse(status_code=504, content={"detail": "Database query timed out"})
+    logger.error(f"Database error in {request.method} {request.url.path}", exc_info=exc)
+    return JSONResponse(status_code=500, content={"detail": "Database error"})
+
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
 
+@app.get("/api/ready")
+def readiness_check():
+    """Readiness endpoint: 200 once a dataset is loaded, 503 with per-table load progress before"""
+    status = get_load_status()
+    if not status.refresh():
+        return not_ready_response(config['server'].get('retry_after', DEFAULT_RETRY_AFTER))
+    return status.to_response()
+
+
+@app.post("/api/admin/reload")
+def reload_data(force: bool = False, db: Session = Depends(get_db)):
+    """Reload tables whose source CSV files changed since the last load"""
+    if get_load_status().loading:
+        raise HTTPException(status_code=409, detail="The startup data load is still running")
+    try:
+        reloaded = load_changed_data(db, config, PROJECT_ROOT, force=force)
+    except LoaderBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if reloaded:
+        invalidate_graph_index()
+        get_load_status().publish_dataset_version()
+    return {"reloaded": reloaded}
+
+
 # Mount static files (frontend) if directory exists
 static_dir = os.path.join(os.path.dirname(__file__), "static")
 if os.path.exists(static_dir):
@@ -136,11 +309,36 @@ else:
 
 
 
-if __name__ == "__main__":
+def run_server(host: str, port: int, workers: int = 1, **options):
+    """Serve the app with uvicorn, in `workers` processes if more than one
+    
+    Either way the server binds right away and the data loads in the
+    background. With several workers, this process does the loading and the
+    workers only serve from it, so they never race each other to load.
+    """
     import uvicorn
     
+    if workers <= 1:
+        uvicorn.run(app, host=host, port=port, **options)
+        return
+    
+    # Create the schema before any worker opens the database
+    engine = init_database(get_db_path(), config['database'].get('performance'))
+    
+    # Workers answer /api/ready from the load status this process publishes;
+    # starting it here replaces the file a previous run left behind
+    status = get_load_status()
+    status.publish_to(status_path_for(get_db_path()))
+    status.start()
+    threading.Thread(target=prepare_database, args=(engine,), name="data-loader", daemon=True).start()
+    os.environ[SERVE_ONLY_ENV] = "1"
+    logger.info(f"Starting {workers} worker processes")
+    uvicorn.run("main:app", host=host, port=port, workers=workers, **options)
+
+
+if __name__ == "__main__":
     host = config['server']['host']
     port = config['server']['port_range'][0]
     
     logger.info(f"Starting server at {host}:{port}")
-    uvicorn.run(app, host=host, port=port, log_level="info")
+    run_server(host, port, workers=config['server'].get('workers') or 1, log_level="info")
@@ -1,7 +1,7 @@
 """
 Pydantic models for data validation and API schemas
 """
-from typing import Optional, List
+from typing import Optional, List, Dict, Union
 from datetime import datetime, date
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -130,6 +130,10 @@ class AwardQueryParams(QueryParams):
     naics_code: Optional[str] = None
 
 
+class FOIATargetQueryParams(QueryParams):
+    agency: Optional[str] = None
+
+
 # Statistics Models
 class StatsResponse(BaseModel):
     total_entities: int
@@ -161,11 +165,81 @@ class GraphData(BaseModel):
     edges: List[GraphEdge]
 
 
+class EntityMetricResponse(BaseModel):
+    name: str
+    entity_id: Optional[str] = None
+    entity_type: Optional[str] = None
+    degree: int
+    in_flow: float
+    out_flow: float
+    pagerank: float
+    betweenness: float
+
+
+# Money Trail Models
+class MoneyPathHop(BaseModel):
+    source: str
+    target: str
+    amount_usd: Optional[float] = None
+    start_date: Optional[date] = None
+    relationship: Optional[str] = None
+    source_citation: Optional[str] = None
+
+
+class MoneyPath(BaseModel):
+    hops: List[MoneyPathHop]
+    total_amount: float
+    bottleneck_amount: float
+
+
+class MoneyPathResponse(BaseModel):
+    source: str
+    target: str
+    mode: str
+    paths: List[MoneyPath]
+    truncated: bool = False
+
+
+# Aggregation Models
+class CubeQuery(BaseModel):
+    fact: str  # awards, money_flows
+    group_by: List[str] = []  # fact dimensions and/or "period"
+    measures: List[str] = ["count", "sum"]  # count, sum, avg, min, max
+    filters: Optional[Dict[str, Union[str, List[str]]]] = None  # dimension -> value(s)
+    granularity: str = "month"  # year, quarter, month (for the "period" dimension)
+    start: Optional[str] = None  # YYYY or YYYY-MM, inclusive
+    end: Optional[str] = None  # YYYY or YYYY-MM, inclusive
+    sort_by: Optional[str] = None  # a group_by dimension or measure
+    sort_desc: bool = True
+    limit: int = Field(1000, ge=1, le=10000)
+
+
+class CubeResponse(BaseModel):
+    fact: str
+    group_by: List[str]
+    measures: List[str]
+    rows: List[dict]
+
+
 # Export Models
 class ExportRequest(BaseModel):
-    data_type: str  # entities, awards, money_flows, foia_targets
-    format: str  # csv, json, pdf
+    data_type: str  # entities, awards, money_flows, foia_targets, summary (pdf only)
+    format: str  # csv, json, ndjson, parquet, arrow, pdf
+    filters: Optional[dict] = None  # same filters as the /api/data list routes
+
+
+class ExportJobResponse(BaseModel):
+    job_id: str
+    status: str  # queued, running, completed, failed
+    data_type: str
+    format: str
     filters: Optional[dict] = None
+    rows_written: int = 0
+    total_rows: Optional[int] = None
+    percent: float = 0.0
+    size_bytes: Optional[int] = None
+    error: Optional[str] = None
+    download_url: Optional[str] = None
 
 
 class ContributionBase(BaseModel):
@@ -0,0 +1,122 @@
+"""
+Keyset (cursor) pagination for the list endpoints
+"""
+import json
+import base64
+from datetime import date
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import Date, tuple_
+
+
+# Response header carrying the cursor for the page after the one returned
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_by: str, sort_desc: bool, value: Any, row_id: int) -> str:
+    """Opaque cursor pointing just past the row with (value, row_id)"""
+    if isinstance(value, date):
+        value = value.isoformat()
+    payload = json.dumps({"s": sort_by, "d": sort_desc, "v": value, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_desc: bool, column) -> Tuple[Any, int]:
+    """Recover (value, row_id) from a cursor issued for the same sort"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["s"] != sort_by or payload["d"] != sort_desc:
+            raise ValueError("cursor was issued for a different sort")
+        value, row_id = payload["v"], int(payload["id"])
+        if value is not None and isinstance(column.type, Date):
+            value = date.fromisoformat(value)
+        return value, row_id
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+
+def keyset_page(
+    query,
+    model,
+    sort_by: str,
+    sort_desc: bool,
+    cursor: Optional[str],
+    limit: int,
+    sortable: List[str],
+) -> Tuple[list, Optional[str]]:
+    """Fetch one page ordered by (sort_by, id) starting after `cursor`
+    
+    Each page is an index seek on the sort column rather than an OFFSET
+    scan, so deep pages cost the same as the first. Rows whose sort value
+    is NULL come after all others in either direction, ordered by id.
+    
+    Returns:
+        The page's rows and the cursor for the next page (None on the last page)
+    """
+    if sort_by not in sortable:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot sort by '{sort_by}', expected one of: {', '.join(sortable)}",
+        )
+    
+    column = getattr(model, sort_by)
+    id_column = model.id
+    value, last_id = decode_cursor(cursor, sort_by, sort_desc, column) if cursor else (None, None)
+    in_null_phase = cursor is not None and value is None
+    
+    def after(lhs, rhs):
+        return lhs < rhs if sort_desc else lhs > rhs
+    
+    def ordered(*columns):
+        return [c.desc() if sort_desc else c.asc() for c in columns]
+    
+    rows = []
+    if column is id_column:
+        page = query
+        if last_id is not None:
+            page = page.filter(after(id_column, last_id))
+        rows = page.order_by(*ordered(id_column)).limit(limit).all()
+    else:
+        if not in_null_phase:
+            page = query.filter(column.isnot(None))
+            if cursor is not None:
+                page = page.filter(after(tuple_(column, id_column), tuple_(value, last_id)))
+            rows = page.order_by(*ordered(column, id_column)).limit(limit).all()
+        
+        if len(rows) < limit:
+            page = query.filter(column.is_(None))
+            if in_null_phase:
+                page = page.filter(after(id_column, last_id))
+            rows += page.order_by(*ordered(id_column)).limit(limit - len(rows)).all()
+    
+    next_cursor = None
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_by, sort_desc, getattr(last, sort_by), last.id)
+    return rows, next_cursor
+
+
+def paginate(
+    query,
+    model,
+    response,
+    skip: int,
+    limit: int,
+    sort_by: Optional[str],
+    sort_desc: bool,
+    cursor: Optional[str],
+    sortable: List[str],
+) -> list:
+    """Page a list route's query by cursor when asked to, else by skip/limit
+    
+    Keyset mode is used whenever `sort_by` or `cursor` is given; the next
+    page's cursor is returned in the X-Next-Cursor response header.
+    """
+    if sort_by is None and cursor is None:
+        return query.offset(skip).limit(limit).all()
+    
+    rows, next_cursor = keyset_page(query, model, sort_by or "id", sort_desc, cursor, limit, sortable)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows
@@ -0,0 +1,272 @@
+"""
+Background data load status and the readiness gate in front of the data routes
+"""
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Optional
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+
+from data_loader import current_dataset_version, get_dataset_version, set_current_dataset_version
+from database import SourceManifest
+from dependencies import read_session
+
+logger = logging.getLogger(__name__)
+
+# Routes that need a loaded dataset to answer
+GATED_PREFIXES = ("/api/data", "/api/analysis", "/api/export", "/api/admin")
+
+# Seconds clients are told to wait before retrying while the data loads
+DEFAULT_RETRY_AFTER = 5
+
+# Seconds between database checks for a committed dataset while not ready
+DATASET_CHECK_INTERVAL = 1.0
+
+# Table states after which a table's load is over
+FINISHED_STATES = {"missing", "unchanged", "loaded", "failed"}
+
+# Fields of a LoadStatus shared between the loading process and serve-only workers
+PUBLISHED_FIELDS = ("state", "error", "started_at", "finished_at", "tables")
+
+
+def status_path_for(db_path: str) -> str:
+    """Path of the file the loading process publishes its load status in"""
+    return f"{db_path}.load-status.json"
+
+
+class LoadStatus:
+    """Progress of the startup data load, updated by the loader thread and read by the routes
+    
+    The data is ready as soon as any complete dataset has been committed,
+    which on later runs is before the load even starts: the loader swaps
+    new tables in atomically, so the previous data is served meanwhile.
+    
+    The loading process publishes every change to a status file (see
+    `publish_to`). Serve-only worker processes read their state from that
+    file (see `serve_only`). The file also carries the dataset version, so
+    the workers learn of reloads without asking the database.
+    """
+    
+    def __init__(self):
+        self.state = "starting"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.dataset_available = False
+        self.tables: Dict[str, dict] = {}
+        self.status_path: Optional[str] = None
+        self.reads_published = False
+        self._checked_at = 0.0
+        self._published_mtime = None
+        self._lock = threading.Lock()
+    
+    @property
+    def ready(self) -> bool:
+        return self.dataset_available
+    
+    def publish_to(self, status_path: str):
+        """Write this status to `status_path` on every change, for other processes to read"""
+        with self._lock:
+            self.status_path = status_path
+            self._publish()
+    
+    def serve_only(self, status_path: str):
+        """Mark this process as serving data loaded by another one, which publishes to `status_path`"""
+        with self._lock:
+            self.state = "serving"
+            self.status_path = status_path
+            self.reads_published = True
+    
+    def start(self):
+        with self._lock:
+            self.state = "loading"
+            self.error = None
+            self.started_at = time.time()
+            self.finished_at = None
+            self.tables = {}
+            self._publish()
+    
+    def update_table(self, table_name: str, state: str, rows: Optional[int] = None):
+        """Progress callback for `load_changed_data`"""
+        with self._lock:
+            table = self.tables.setdefault(table_name, {"state": state, "rows": None})
+            table["state"] = state
+            if rows is not None:
+                table["rows"] = rows
+            self._publish()
+    
+    def finish(self):
+        with self._lock:
+            self.state = "loaded"
+            self.finished_at = time.time()
+            self._publish()
+        self.refresh(force=True)
+    
+    def fail(self, error: Exception):
+        with self._lock:
+            self.state = "failed"
+            self.error = str(error)
+            self.finished_at = time.time()
+            for table in self.tables.values():
+                if table["state"] not in FINISHED_STATES:
+                    table["state"] = "failed"
+            self._publish()
+    
+    def _publish(self):
+        """Atomically replace the status file, if this process publishes one (lock held)"""
+        if self.status_path is None or self.reads_published:
+            return
+        tmp_path = f"{self.status_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    **{field: getattr(self, field) for field in PUBLISHED_FIELDS},
+                    "dataset_version": current_dataset_version(),
+                }, f)
+            os.replace(tmp_path, self.status_path)
+        except OSError as e:
+            logger.warning(f"Cannot publish load status to {self.status_path}: {e}")
+    
+    def publish_dataset_version(self):
+        """Tell the other processes sharing the status file that this one reloaded the data"""
+        with self._lock:
+            if self.status_path is None:
+                return
+            if not self.reads_published:
+                self._publish()
+                return
+            # A serve-only worker rewrites the loading process's file with just the version changed
+            tmp_path = f"{self.status_path}.{os.getpid()}.tmp"
+            try:
+                with open(self.status_path) as f:
+                    published = json.load(f)
+                published["dataset_version"] = current_dataset_version()
+                with open(tmp_path, "w") as f:
+                    json.dump(published, f)
+                os.replace(tmp_path, self.status_path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cannot publish dataset version to {self.status_path}: {e}")
+    
+    def _read_published(self):
+        """Take over the state published by the loading process (lock held)"""
+        if not self.reads_published:
+            return
+        try:
+            with open(self.status_path) as f:
+                published = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.debug(f"Cannot read load status from {self.status_path}: {e}")
+            return
+        for field in PUBLISHED_FIELDS:
+            if field in published:
+                setattr(self, field, published[field])
+        if published.get("dataset_version"):
+            set_current_dataset_version(published["dataset_version"])
+    
+    def dataset_version(self) -> Optional[str]:
+        """Version of the loaded dataset, without a database query (see current_dataset_version)
+        
+        Serve-only workers reread the status file whenever it has changed,
+        which picks up reloads done by any other process.
+        """
+        if self.reads_published:
+            try:
+                mtime = os.stat(self.status_path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime is not None and mtime != self._published_mtime:
+                with self._lock:
+                    self._published_mtime = mtime
+                    self._read_published()
+        return current_dataset_version()
+    
+    @property
+    def loading(self) -> bool:
+        with self._lock:
+            self._read_published()
+            return self.state == "loading"
+    
+    def refresh(self, force: bool = False) -> bool:
+        """Check the database for a committed dataset, at most once per DATASET_CHECK_INTERVAL
+        
+        The loader writes the source manifest in the same transaction as the
+        data, so any manifest row means a complete dataset is in place. The
+        dataset's version is recorded along with it.
+        """
+        if self.dataset_available:
+            return True
+        if self.reads_published:
+            # Check right away once the loading process says it's done
+            with self._lock:
+                self._read_published()
+                force = force or self.state == "loaded"
+        now = time.monotonic()
+        if not force and now - self._checked_at < DATASET_CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+        
+        try:
+            with read_session() as db:
+                if db.query(SourceManifest).first() is not None:
+                    if current_dataset_version() is None:
+                        set_current_dataset_version(get_dataset_version(db))
+                    self.dataset_available = True
+        except Exception as e:
+            logger.debug(f"Dataset check failed: {e}")
+        return self.dataset_available
+    
+    def to_response(self) -> dict:
+        with self._lock:
+            self._read_published()
+            finished = [t for t in self.tables.values() if t["state"] in FINISHED_STATES]
+            elapsed = None
+            if self.started_at is not None:
+                elapsed = round((self.finished_at or time.time()) - self.started_at, 2)
+            return {
+                "ready": self.ready,
+                "state": self.state,
+                "error": self.error,
+                "elapsed_seconds": elapsed,
+                "tables_done": len(finished),
+                "tables_total": len(self.tables),
+                "tables": {name: dict(table) for name, table in self.tables.items()},
+            }
+
+
+# Load status of this process
+_status = LoadStatus()
+
+
+def get_load_status() -> LoadStatus:
+    return _status
+
+
+def not_ready_response(retry_after: int = DEFAULT_RETRY_AFTER) -> JSONResponse:
+    """503 telling the client to come back once the data has loaded"""
+    status = get_load_status()
+    content = status.to_response()
+    content["detail"] = "Data failed to load" if content["state"] == "failed" else "Data is still loading"
+    return JSONResponse(status_code=503, content=content, headers={"Retry-After": str(retry_after)})
+
+
+class ReadinessMiddleware(BaseHTTPMiddleware):
+    """Answer requests to the data routes with 503 and Retry-After until a dataset is loaded"""
+    
+    def __init__(self, app, retry_after: int = DEFAULT_RETRY_AFTER):
+        super().__init__(app)
+        self.retry_after = retry_after
+    
+    async def dispatch(self, request, call_next):
+        status = get_load_status()
+        if status.ready or not request.url.path.startswith(GATED_PREFIXES):
+            return await call_next(request)
+        
+        if await run_in_threadpool(status.refresh):
+            return await call_next(request)
+        return not_ready_response(self.retry_after)
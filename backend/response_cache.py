@@ -0,0 +1,120 @@
+"""
+ETag revalidation and an in-process cache of serialized responses for the read-only API routes
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+
+from readiness import get_load_status
+
+logger = logging.getLogger(__name__)
+
+# Routes whose responses only change when the dataset is reloaded
+CACHED_PREFIXES = ("/api/data", "/api/analysis")
+
+DEFAULT_MAX_MB = 64
+DEFAULT_MAX_ENTRY_KB = 2048
+
+
+class ResponseLRU:
+    """Serialized response bodies, evicted least recently used first once over `max_bytes`"""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[tuple, Tuple[int, Dict[str, str], bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: tuple) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def put(self, key: tuple, status_code: int, headers: Dict[str, str], body: bytes):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[2])
+            self._entries[key] = (status_code, headers, body)
+            self.size += len(body)
+            while self.size > self.max_bytes and self._entries:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header lists `etag` (or is a wildcard)"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """Strong ETags and cached bodies for GET requests to the read-only API routes
+    
+    The ETag of a response is derived from the dataset version and the
+    request URL, so it stays valid until the loader changes the data.
+    Requests whose If-None-Match carries it get a 304 without running the
+    route; other repeats are answered from an LRU of serialized bodies.
+    Responses are marked `no-cache` so browsers always revalidate. Routes
+    opt a response out of caching by sending `Cache-Control: no-store`
+    (e.g. results cut short by a time limit).
+    """
+    
+    def __init__(self, app, max_mb: int = DEFAULT_MAX_MB, max_entry_kb: int = DEFAULT_MAX_ENTRY_KB):
+        super().__init__(app)
+        self.cache = ResponseLRU(max_mb * 1024 * 1024)
+        self.max_entry_bytes = max_entry_kb * 1024
+        self.version = None
+    
+    async def dispatch(self, request, call_next):
+        if request.method != "GET" or not request.url.path.startswith(CACHED_PREFIXES):
+            return await call_next(request)
+        
+        # Kept in memory by the loader and the load status, so this costs no query
+        version = get_load_status().dataset_version()
+        if version is None:
+            return await call_next(request)
+        if version != self.version:
+            # Bodies of the previous dataset can never be served again
+            self.cache.clear()
+            self.version = version
+        
+        query = tuple(sorted(request.query_params.multi_items()))
+        key = (version, request.url.path, query)
+        digest = hashlib.sha256(repr(key[1:]).encode()).hexdigest()[:16]
+        etag = f'"{version}-{digest}"'
+        validators = {"ETag": etag, "Cache-Control": "no-cache"}
+        
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=validators)
+        
+        cached = self.cache.get(key)
+        if cached is not None:
+            status_code, headers, body = cached
+            return Response(content=body, status_code=status_code, headers={**headers, **validators})
+        
+        response = await call_next(request)
+        if response.status_code != 200 or "no-store" in response.headers.get("cache-control", ""):
+            return response
+        
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in ("content-length", "etag", "cache-control")
+        }
+        if len(body) <= self.max_entry_bytes:
+            self.cache.put(key, response.status_code, headers, body)
+        return Response(content=body, status_code=response.status_code, headers={**headers, **validators})
@@ -2,110 +2,104 @@
 Analysis API routes for graph data and relationship exploration
 """
 from typing import List, Dict
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
-from database import Entity, MoneyFlow, Relationship
-from models.schemas import GraphData, GraphNode, GraphEdge
+from database import Entity, EntityMetric, MoneyFlow, Relationship, Rollup
+from models.schemas import GraphData, GraphNode, GraphEdge, MoneyPathResponse, EntityMetricResponse, CubeQuery, CubeResponse
+from services.graph_index import get_graph_index
+from services.money_paths import find_money_paths, PATH_MODES
+from services.cube import query_cube
+from serialization import parse_graph_fields, graph_response
+from services.rollups import TABLE_TOTALS, FLOWS_BY_YEAR, FLOWS_BY_MONTH, FLOWS_BY_SOURCE, FLOWS_BY_TARGET, AWARDS_BY_AGENCY
 
 # Import database dependency
-from dependencies import get_db
+from dependencies import get_read_db
 
 router = APIRouter()
 
+# Precomputed metrics entities can be ranked by (each column is indexed)
+RANKING_METRICS = ["pagerank", "betweenness", "degree", "in_flow", "out_flow"]
+
 
 @router.get("/graph/entities", response_model=GraphData)
-async def get_entity_graph(
+def get_entity_graph(
     limit: int = Query(100, le=500),
-    db: Session = Depends(get_db)
+    fields: str = Query(None),
+    db: Session = Depends(get_read_db)
 ):
     """Get entity relationship graph data"""
-    # Get all relationships first to know which entities to include
-    relationships = db.query(Relationship).limit(limit * 2).all()
-    
-    # Get all entities
-    all_entities = db.query(Entity).all()
-    
-    # Create a mapping of names to entities for lookup
-    entity_map = {}
-    for e in all_entities:
-        # Map by display name, normalized name, and id
-        if e.display_name:
-            entity_map[e.display_name] = e
-            entity_map[e.display_name.lower()] = e
-        if e.normalized_name:
-            entity_map[e.normalized_name] = e
-        entity_map[e.entity_id] = e
-    
-    # Extract all unique entity names from relationships
-    entity_names_in_graph = set()
-    for r in relationships:
-        entity_names_in_graph.add(r.source)
-        entity_names_in_graph.add(r.target)
-    
-    # Calculate connection counts
-    connection_counts = {}
-    for r in relationships:
-        connection_counts[r.source] = connection_counts.get(r.source, 0) + 1
-        connection_counts[r.target] = connection_counts.get(r.target, 0) + 1
-    
-    # Create nodes - use entity names as IDs to match relationships
-    nodes = []
-    seen_names = set()
-    
-    for entity_name in entity_names_in_graph:
-        if entity_name in seen_names:
-            continue
-        seen_names.add(entity_name)
-        
-        # Try to find the entity in our database
-        entity = entity_map.get(entity_name) or entity_map.get(entity_name.lower())
-        
-        # Get connection count
-        connections = connection_counts.get(entity_name, 0)
-        
-        # Scale node size: base 8, +3 per connection, max 25
-        node_value = min(8 + (connections * 3), 25)
-        
-        # Determine entity type
-        if entity and entity.entity_type:
-            entity_type = entity.entity_type
-        else:
-            # Infer from name if not in database
-            from data_loader import infer_entity_type
-            entity_type = infer_entity_type(entity_name)
-        
-        nodes.append(
-            GraphNode(
-                id=entity_name,  # Use name as ID to match relationships
-                name=entity_name,
-                type=entity_type,
-                value=node_value
-            )
-        )
+    graph_fields = parse_graph_fields(fields)
+    return graph_response(get_graph_index(db).entity_graph(limit), graph_fields)
+
+
+@router.get("/graph/ego/{entity_name}", response_model=GraphData)
+def get_ego_graph(
+    entity_name: str,
+    depth: int = Query(2, ge=1, le=4),
+    max_neighbors: int = Query(25, ge=1, le=200),
+    min_amount: float = Query(None),
+    max_nodes: int = Query(200, ge=1, le=1000),
+    fields: str = Query(None),
+    db: Session = Depends(get_read_db)
+):
+    """Get the N-hop neighborhood of an entity"""
+    graph_fields = parse_graph_fields(fields)
+    index = get_graph_index(db)
+    centers = index.find_nodes(entity_name)
+    if not centers:
+        raise HTTPException(status_code=404, detail=f"Entity not found in graph: {entity_name}")
     
-    # Create edges using entity names (which now match node IDs)
-    edges = [
-        GraphEdge(
-            source=r.source,
-            target=r.target,
-            label=r.label
-        )
-        for r in relationships
-    ]
+    return graph_response(index.ego_graph(centers, depth, max_neighbors, min_amount, max_nodes), graph_fields)
+
+
+@router.get("/paths/money", response_model=MoneyPathResponse)
+def get_money_paths(
+    response: Response,
+    source: str,
+    target: str,
+    mode: str = Query("shortest"),
+    k: int = Query(1, ge=1, le=20),
+    max_hops: int = Query(6, ge=1, le=10),
+    min_amount: float = Query(None),
+    time_budget_ms: int = Query(1000, ge=10, le=10000),
+    db: Session = Depends(get_read_db)
+):
+    """Find how money gets from one entity to another through money flows"""
+    if mode not in PATH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(PATH_MODES)}")
     
-    return GraphData(nodes=nodes, edges=edges)
+    index = get_graph_index(db)
+    sources = index.find_nodes(source)
+    targets = index.find_nodes(target)
+    if not sources:
+        raise HTTPException(status_code=404, detail=f"Entity not found in graph: {source}")
+    if not targets:
+        raise HTTPException(status_code=404, detail=f"Entity not found in graph: {target}")
+    
+    paths, truncated = find_money_paths(
+        index, sources, targets,
+        mode=mode, k=k, max_hops=max_hops, min_amount=min_amount,
+        time_budget=time_budget_ms / 1000,
+    )
+    if truncated:
+        # Cut short by the time budget, so another run may find more: never cache it
+        response.headers["Cache-Control"] = "no-store"
+    return MoneyPathResponse(source=source, target=target, mode=mode, paths=paths, truncated=truncated)
 
 
 @router.get("/graph/money-flows", response_model=GraphData)
-async def get_money_flow_graph(
+def get_money_flow_graph(
     min_amount: float = Query(None),
     limit: int = Query(100, le=500),
-    db: Session = Depends(get_db)
+    fields: str = Query(None),
+    db: Session = Depends(get_read_db)
 ):
     """Get money flow graph data"""
-    query = db.query(MoneyFlow)
+    graph_fields = parse_graph_fields(fields)
+    
+    # Only the columns the graph is built from
+    query = db.query(MoneyFlow.source, MoneyFlow.target, MoneyFlow.amount_usd, MoneyFlow.relationship)
     
     if min_amount:
         query = query.filter(MoneyFlow.amount_usd >= min_amount)
@@ -138,13 +132,47 @@ async def get_money_flow_graph(
         for flow in flows if flow.amount_usd
     ]
     
-    return GraphData(nodes=nodes, edges=edges)
+    return graph_response(GraphData(nodes=nodes, edges=edges), graph_fields)
+
+
+@router.get("/rankings", response_model=List[EntityMetricResponse])
+def get_entity_rankings(
+    metric: str = Query("pagerank"),
+    entity_type: str = Query(None),
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """Get entities ranked by a precomputed centrality or flow metric"""
+    if metric not in RANKING_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(RANKING_METRICS)}")
+    
+    query = db.query(EntityMetric, Entity.entity_type).outerjoin(
+        Entity, Entity.entity_id == EntityMetric.entity_id
+    )
+    if entity_type:
+        query = query.filter(Entity.entity_type == entity_type)
+    
+    rows = query.order_by(getattr(EntityMetric, metric).desc()).limit(limit).all()
+    
+    return [
+        EntityMetricResponse(
+            name=m.name,
+            entity_id=m.entity_id,
+            entity_type=entity_type,
+            degree=m.degree,
+            in_flow=m.in_flow,
+            out_flow=m.out_flow,
+            pagerank=m.pagerank,
+            betweenness=m.betweenness
+        )
+        for m, entity_type in rows
+    ]
 
 
 @router.get("/relationships/{entity_name}")
-async def get_entity_relationships(
+def get_entity_relationships(
     entity_name: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all relationships for a specific entity"""
     # Money flows where entity is source or target
@@ -183,41 +211,41 @@ async def get_entity_relationships(
 
 
 @router.get("/financial/flows")
-async def get_financial_flows(
-    db: Session = Depends(get_db)
+def get_financial_flows(
+    db: Session = Depends(get_read_db)
 ):
     """Get financial flow summary by entity"""
-    # Sum money flows by source
-    outflows = db.query(
-        MoneyFlow.source,
-        func.sum(MoneyFlow.amount_usd).label('total')
-    ).group_by(MoneyFlow.source).all()
-    
-    # Sum money flows by target
-    inflows = db.query(
-        MoneyFlow.target,
-        func.sum(MoneyFlow.amount_usd).label('total')
-    ).group_by(MoneyFlow.target).all()
+    # Money flow totals by source and by target, from the rollups
+    rollups = db.query(Rollup.dimension, Rollup.key, Rollup.total).filter(
+        Rollup.dimension.in_([FLOWS_BY_SOURCE, FLOWS_BY_TARGET])
+    ).order_by(Rollup.dimension, Rollup.key).all()
     
     return {
-        "outflows": [{"entity": o[0], "amount": o[1]} for o in outflows if o[1]],
-        "inflows": [{"entity": i[0], "amount": i[1]} for i in inflows if i[1]]
+        "outflows": [{"entity": r.key, "amount": r.total} for r in rollups if r.dimension == FLOWS_BY_SOURCE and r.total],
+        "inflows": [{"entity": r.key, "amount": r.total} for r in rollups if r.dimension == FLOWS_BY_TARGET and r.total]
     }
 
 
 @router.get("/financial/totals")
-async def get_financial_totals(
-    db: Session = Depends(get_db)
+def get_financial_totals(
+    db: Session = Depends(get_read_db)
 ):
     """Get total financial amounts by category"""
-    total_money_flows = db.query(func.sum(MoneyFlow.amount_usd)).scalar() or 0
-    total_awards = db.query(func.sum(Award.award_amount)).scalar() or 0
+    table_totals = dict(
+        db.query(Rollup.key, Rollup.total).filter(Rollup.dimension == TABLE_TOTALS).all()
+    )
+    total_money_flows = table_totals.get("money_flows") or 0
+    total_awards = table_totals.get("awards") or 0
     
     # Get top recipients
-    top_recipients = db.query(
-        MoneyFlow.target,
-        func.sum(MoneyFlow.amount_usd).label('total')
-    ).group_by(MoneyFlow.target).order_by(func.sum(MoneyFlow.amount_usd).desc()).limit(10).all()
+    top_recipients = db.query(Rollup.key, Rollup.total).filter(
+        Rollup.dimension == FLOWS_BY_TARGET
+    ).order_by(Rollup.total.desc()).limit(10).all()
+    
+    # Get top awarding agencies
+    top_agencies = db.query(Rollup.key, Rollup.total, Rollup.row_count).filter(
+        Rollup.dimension == AWARDS_BY_AGENCY
+    ).order_by(Rollup.total.desc()).limit(10).all()
     
     return {
         "total_money_flows": float(total_money_flows),
@@ -225,30 +253,67 @@ async def get_financial_totals(
         "top_recipients": [
             {"entity": r[0], "amount": float(r[1])}
             for r in top_recipients if r[1]
+        ],
+        "top_agencies": [
+            {"agency": a[0], "amount": float(a[1]), "count": a[2]}
+            for a in top_agencies if a[0] and a[1]
         ]
     }
 
 
 @router.get("/timeline")
-async def get_timeline(
-    db: Session = Depends(get_db)
+def get_timeline(
+    interval: str = Query("year", pattern="^(year|month)$"),
+    db: Session = Depends(get_read_db)
 ):
-    """Get timeline of money flows"""
-    flows = db.query(
-        func.strftime('%Y', MoneyFlow.start_date).label('year'),
-        func.count(MoneyFlow.id).label('count'),
-        func.sum(MoneyFlow.amount_usd).label('total')
-    ).filter(
-        MoneyFlow.start_date.isnot(None)
-    ).group_by('year').order_by('year').all()
+    """Get timeline of money flows, by year or by month (YYYY-MM)"""
+    dimension = FLOWS_BY_YEAR if interval == "year" else FLOWS_BY_MONTH
+    flows = db.query(Rollup.key, Rollup.row_count, Rollup.total).filter(
+        Rollup.dimension == dimension
+    ).order_by(Rollup.key).all()
     
     return {
         "timeline": [
             {
-                "year": f[0],
+                interval: f[0],
                 "count": f[1],
                 "total_amount": float(f[2]) if f[2] else 0
             }
             for f in flows
         ]
     }
+
+
+@router.post("/cube", response_model=CubeResponse)
+def aggregate_cube(
+    request: CubeQuery,
+    db: Session = Depends(get_read_db)
+):
+    """Group awards or money flows by any of their dimensions and period
+    
+    Answered from the pre-aggregated award_cube / flow_cube tables, so
+    arbitrary pivots don't rescan the fact tables.
+    """
+    try:
+        rows = query_cube(
+            db,
+            request.fact,
+            request.group_by,
+            request.measures,
+            filters=request.filters,
+            granularity=request.granularity,
+            start=request.start,
+            end=request.end,
+            sort_by=request.sort_by,
+            sort_desc=request.sort_desc,
+            limit=request.limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return CubeResponse(
+        fact=request.fact,
+        group_by=request.group_by,
+        measures=request.measures,
+        rows=rows
+    )
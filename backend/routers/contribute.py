@@ -14,7 +14,7 @@ router = APIRouter()
 
 
 @router.post("/entity", response_model=ContributionResponse)
-async def contribute_entity(
+def contribute_entity(
     entity: EntityCreate,
     contributor_name: str = None,
     contributor_email: str = None,
@@ -51,7 +51,7 @@ async def contribute_entity(
 
 
 @router.post("/money-flow", response_model=ContributionResponse)
-async def contribute_money_flow(
+def contribute_money_flow(
     money_flow: MoneyFlowCreate,
     contributor_name: str = None,
     contributor_email: str = None,
@@ -87,7 +87,7 @@ async def contribute_money_flow(
 
 
 @router.post("/award", response_model=ContributionResponse)
-async def contribute_award(
+def contribute_award(
     award: AwardCreate,
     contributor_name: str = None,
     contributor_email: str = None,
@@ -123,7 +123,7 @@ async def contribute_award(
 
 
 @router.post("/foia-target", response_model=ContributionResponse)
-async def contribute_foia_target(
+def contribute_foia_target(
     foia_target: FOIATargetCreate,
     contributor_name: str = None,
     contributor_email: str = None,
@@ -159,7 +159,7 @@ async def contribute_foia_target(
 
 
 @router.get("/validate-token")
-async def validate_github_token(
+def validate_github_token(
     github_token: str = Header(None, alias="X-GitHub-Token")
 ):
     """Validate GitHub token"""
@@ -2,11 +2,14 @@
 Data API routes for entities, awards, money flows, and FOIA targets
 """
 from typing import List
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
 
-from database import Entity, MoneyFlow, Award, FOIATarget
+from database import Entity, MoneyFlow, Award, FOIATarget, Rollup
+from filters import filter_entities, filter_money_flows, filter_awards, filter_foia_targets
+from pagination import paginate
+from serialization import parse_fields, row_columns, rows_response
+from services.rollups import TABLE_TOTALS
 from models.schemas import (
     EntityResponse, EntityQueryParams,
     MoneyFlowResponse, MoneyFlowQueryParams,
@@ -15,74 +18,79 @@ from models.schemas import (
 )
 
 # Import database dependency
-from dependencies import get_db
+from dependencies import get_read_db
 
 router = APIRouter()
 
+# List routes select plain column tuples, only those named by `fields=` if
+# given, and serialize them directly (see serialization.py); response_model
+# only documents the full row shape
+
+# Columns each list route can be keyset-paginated on (each has an index)
+ENTITY_SORTS = ["id", "display_name"]
+MONEY_FLOW_SORTS = ["id", "amount_usd", "start_date"]
+AWARD_SORTS = ["id", "award_amount", "action_date"]
+FOIA_TARGET_SORTS = ["id"]
+
 
 @router.get("/entities", response_model=List[EntityResponse])
-async def get_entities(
+def get_entities(
+    response: Response,
     search: str = Query(None),
     entity_type: str = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, le=1000),
-    db: Session = Depends(get_db)
+    sort_by: str = Query(None),
+    sort_desc: bool = Query(False),
+    cursor: str = Query(None),
+    fields: str = Query(None),
+    db: Session = Depends(get_read_db)
 ):
     """Get entities with optional filtering"""
-    query = db.query(Entity)
-    
-    if search:
-        query = query.filter(
-            or_(
-                Entity.display_name.ilike(f"%{search}%"),
-                Entity.normalized_name.ilike(f"%{search}%")
-            )
-        )
-    
-    if entity_type:
-        query = query.filter(Entity.entity_type == entity_type)
-    
-    return query.offset(skip).limit(limit).all()
+    fields = parse_fields(EntityResponse, fields)
+    columns = row_columns(Entity, fields, sort_by, ENTITY_SORTS)
+    query = filter_entities(
+        db.query(*columns), search=search, entity_type=entity_type,
+        ranked=sort_by is None and cursor is None
+    )
+    rows = paginate(query, Entity, response, skip, limit, sort_by, sort_desc, cursor, ENTITY_SORTS)
+    return rows_response(rows, fields, response)
 
 
 @router.get("/entities/{entity_id}", response_model=EntityResponse)
-async def get_entity(entity_id: str, db: Session = Depends(get_db)):
+def get_entity(entity_id: str, db: Session = Depends(get_read_db)):
     """Get a single entity by ID"""
     return db.query(Entity).filter(Entity.entity_id == entity_id).first()
 
 
 @router.get("/money-flows", response_model=List[MoneyFlowResponse])
-async def get_money_flows(
+def get_money_flows(
+    response: Response,
     search: str = Query(None),
     min_amount: float = Query(None),
     max_amount: float = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, le=1000),
-    db: Session = Depends(get_db)
+    sort_by: str = Query(None),
+    sort_desc: bool = Query(False),
+    cursor: str = Query(None),
+    fields: str = Query(None),
+    db: Session = Depends(get_read_db)
 ):
     """Get money flows with optional filtering"""
-    query = db.query(MoneyFlow)
-    
-    if search:
-        query = query.filter(
-            or_(
-                MoneyFlow.source.ilike(f"%{search}%"),
-                MoneyFlow.target.ilike(f"%{search}%"),
-                MoneyFlow.relationship.ilike(f"%{search}%")
-            )
-        )
-    
-    if min_amount is not None:
-        query = query.filter(MoneyFlow.amount_usd >= min_amount)
-    
-    if max_amount is not None:
-        query = query.filter(MoneyFlow.amount_usd <= max_amount)
-    
-    return query.offset(skip).limit(limit).all()
+    fields = parse_fields(MoneyFlowResponse, fields)
+    columns = row_columns(MoneyFlow, fields, sort_by, MONEY_FLOW_SORTS)
+    query = filter_money_flows(
+        db.query(*columns), search=search, min_amount=min_amount, max_amount=max_amount,
+        ranked=sort_by is None and cursor is None
+    )
+    rows = paginate(query, MoneyFlow, response, skip, limit, sort_by, sort_desc, cursor, MONEY_FLOW_SORTS)
+    return rows_response(rows, fields, response)
 
 
 @router.get("/awards", response_model=List[AwardResponse])
-async def get_awards(
+def get_awards(
+    response: Response,
     search: str = Query(None),
     agency: str = Query(None),
     min_amount: float = Query(None),
@@ -90,84 +98,65 @@ async def get_awards(
     naics_code: str = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, le=1000),
-    db: Session = Depends(get_db)
+    sort_by: str = Query(None),
+    sort_desc: bool = Query(False),
+    cursor: str = Query(None),
+    fields: str = Query(None),
+    db: Session = Depends(get_read_db)
 ):
     """Get awards with optional filtering"""
-    query = db.query(Award)
-    
-    if search:
-        query = query.filter(
-            or_(
-                Award.recipient_name.ilike(f"%{search}%"),
-                Award.description.ilike(f"%{search}%")
-            )
-        )
-    
-    if agency:
-        query = query.filter(
-            or_(
-                Award.awarding_agency.ilike(f"%{agency}%"),
-                Award.funding_agency.ilike(f"%{agency}%")
-            )
-        )
-    
-    if min_amount is not None:
-        query = query.filter(Award.award_amount >= min_amount)
-    
-    if max_amount is not None:
-        query = query.filter(Award.award_amount <= max_amount)
-    
-    if naics_code:
-        query = query.filter(Award.naics_code == naics_code)
-    
-    return query.offset(skip).limit(limit).all()
+    fields = parse_fields(AwardResponse, fields)
+    columns = row_columns(Award, fields, sort_by, AWARD_SORTS)
+    query = filter_awards(
+        db.query(*columns), search=search, agency=agency, min_amount=min_amount,
+        max_amount=max_amount, naics_code=naics_code,
+        ranked=sort_by is None and cursor is None
+    )
+    rows = paginate(query, Award, response, skip, limit, sort_by, sort_desc, cursor, AWARD_SORTS)
+    return rows_response(rows, fields, response)
 
 
 @router.get("/foia-targets", response_model=List[FOIATargetResponse])
-async def get_foia_targets(
+def get_foia_targets(
+    response: Response,
     search: str = Query(None),
     agency: str = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, le=1000),
-    db: Session = Depends(get_db)
+    sort_by: str = Query(None),
+    sort_desc: bool = Query(False),
+    cursor: str = Query(None),
+    fields: str = Query(None),
+    db: Session = Depends(get_read_db)
 ):
     """Get FOIA targets with optional filtering"""
-    query = db.query(FOIATarget)
-    
-    if search:
-        query = query.filter(
-            or_(
-                FOIATarget.record_request.ilike(f"%{search}%"),
-                FOIATarget.notes.ilike(f"%{search}%")
-            )
-        )
-    
-    if agency:
-        query = query.filter(FOIATarget.agency.ilike(f"%{agency}%"))
-    
-    return query.offset(skip).limit(limit).all()
+    fields = parse_fields(FOIATargetResponse, fields)
+    columns = row_columns(FOIATarget, fields, sort_by, FOIA_TARGET_SORTS)
+    query = filter_foia_targets(
+        db.query(*columns), search=search, agency=agency,
+        ranked=sort_by is None and cursor is None
+    )
+    rows = paginate(query, FOIATarget, response, skip, limit, sort_by, sort_desc, cursor, FOIA_TARGET_SORTS)
+    return rows_response(rows, fields, response)
 
 
 @router.get("/stats", response_model=StatsResponse)
-async def get_stats(db: Session = Depends(get_db)):
+def get_stats(db: Session = Depends(get_read_db)):
     """Get overall statistics"""
-    total_entities = db.query(func.count(Entity.id)).scalar()
-    total_money_flows = db.query(func.count(MoneyFlow.id)).scalar()
-    total_awards = db.query(func.count(Award.id)).scalar()
-    total_foia = db.query(func.count(FOIATarget.id)).scalar()
-    
-    total_money = db.query(func.sum(MoneyFlow.amount_usd)).scalar() or 0
+    tables = {
+        r.key: r for r in db.query(Rollup).filter(Rollup.dimension == TABLE_TOTALS)
+    }
+    money_flows = tables.get("money_flows")
     
-    # Get date range
-    min_date = db.query(func.min(MoneyFlow.start_date)).scalar()
-    max_date = db.query(func.max(MoneyFlow.start_date)).scalar()
+    def row_count(table_name: str) -> int:
+        return tables[table_name].row_count if table_name in tables else 0
     
     return StatsResponse(
-        total_entities=total_entities,
-        total_money_flows=total_money_flows,
-        total_awards=total_awards,
-        total_foia_targets=total_foia,
-        total_money_amount=float(total_money),
-        date_range_start=min_date,
-        date_range_end=max_date
+        total_entities=row_count("entities"),
+        total_money_flows=row_count("money_flows"),
+        total_awards=row_count("awards"),
+        total_foia_targets=row_count("foia_targets"),
+        total_money_amount=float(money_flows.total or 0) if money_flows else 0.0,
+        date_range_start=money_flows.min_date if money_flows else None,
+        date_range_end=money_flows.max_date if money_flows else None
     )
@@ -1,205 +1,353 @@
 """
 Export API routes for CSV, JSON, and PDF generation
 """
-import io
-import csv
+import os
+import re
 import json
-from typing import List
-from fastapi import APIRouter, Depends, Query, Response
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-
-from database import Entity, MoneyFlow, Award, FOIATarget
-from models.schemas import ExportRequest
+from typing import List, Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+from database import Entity, MoneyFlow
+from readiness import get_load_status
+from models.schemas import ExportRequest, ExportJobResponse
+from services.exporter import EXPORTS, EXPORT_FORMATS, ExportFormatUnavailable, iter_export
+from services.export_jobs import SUMMARY_REPORT, get_job_manager
+from services.export_cache import cache_key, get_export_cache
+from filters import validate_filters
 
 # Import database dependency
-from dependencies import get_db
+from dependencies import read_session
 
 router = APIRouter()
 
 
-@router.get("/csv/entities")
-async def export_entities_csv(
-    db: Session = Depends(get_db)
+# URL names of the export tables
+DATASETS = {
+    "entities": "entities",
+    "money-flows": "money_flows",
+    "awards": "awards",
+    "foia-targets": "foia_targets",
+}
+
+# File extension for each export format
+EXTENSIONS = {"csv": "csv", "json": "json", "ndjson": "ndjson", "parquet": "parquet", "arrow": "arrows"}
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows a gzip response"""
+    if not accept_encoding:
+        return False
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def cached_export(
+    key_parts: tuple,
+    fmt: str,
+    media_type: str,
+    filename: str,
+    produce,
+    accept_encoding: Optional[str] = None,
 ):
-    """Export entities to CSV"""
-    entities = db.query(Entity).all()
+    """Serve an export from the export cache, generating and caching it on a miss
     
-    output = io.StringIO()
-    writer = csv.writer(output)
+    `produce` returns the export's chunks and is only called on a miss.
+    Cached text exports are sent pre-gzipped to clients that accept it.
+    """
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    cache = get_export_cache()
+    if cache is None:
+        return StreamingResponse(produce(), media_type=media_type, headers=headers)
     
-    # Write header
-    writer.writerow(['entity_id', 'display_name', 'normalized_name', 'entity_type'])
+    version = get_load_status().dataset_version()
+    if version is None:
+        return StreamingResponse(produce(), media_type=media_type, headers=headers)
+    key = cache_key(*key_parts)
+    extension = filename.rsplit(".", 1)[-1]
+    headers["Vary"] = "Accept-Encoding"
     
-    # Write data
-    for e in entities:
-        writer.writerow([e.entity_id, e.display_name, e.normalized_name, e.entity_type])
+    cached = cache.lookup(version, key, extension)
+    if cached is not None:
+        if cached.gzip_path and accepts_gzip(accept_encoding):
+            headers["Content-Encoding"] = "gzip"
+            return FileResponse(cached.gzip_path, media_type=media_type, headers=headers)
+        return FileResponse(cached.path, media_type=media_type, headers=headers)
     
-    output.seek(0)
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=entities.csv"}
+        cache.store(version, key, extension, fmt, produce()),
+        media_type=media_type,
+        headers=headers
     )
 
 
+def stream_export(data_type: str, fmt: str, filters: dict = None, accept_encoding: Optional[str] = None):
+    """Download of one of the export tables in any export format, cached per dataset version"""
+    spec = EXPORTS[data_type]
+    try:
+        chunks = iter_export(data_type, fmt, filters)
+    except ExportFormatUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    return cached_export(
+        ("export", data_type, fmt, filters or {}),
+        fmt,
+        EXPORT_FORMATS[fmt],
+        f"{spec.filename}.{EXTENSIONS[fmt]}",
+        lambda: chunks,
+        accept_encoding
+    )
+
+
+def resolve_dataset(dataset: str) -> str:
+    """Export table name for a dataset URL name"""
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset '{dataset}', expected one of: {', '.join(DATASETS)}")
+    return DATASETS[dataset]
+
+
+def stream_csv(data_type: str, accept_encoding: Optional[str] = None):
+    """Streaming CSV download of one of the export tables"""
+    return stream_export(data_type, "csv", accept_encoding=accept_encoding)
+
+
+@router.get("/csv/entities")
+def export_entities_csv(accept_encoding: Optional[str] = Header(None)):
+    """Export entities to CSV"""
+    return stream_csv("entities", accept_encoding)
+
+
 @router.get("/csv/money-flows")
-async def export_money_flows_csv(
-    db: Session = Depends(get_db)
-):
+def export_money_flows_csv(accept_encoding: Optional[str] = Header(None)):
     """Export money flows to CSV"""
-    flows = db.query(MoneyFlow).all()
+    return stream_csv("money_flows", accept_encoding)
+
+
+@router.get("/csv/awards")
+def export_awards_csv(accept_encoding: Optional[str] = Header(None)):
+    """Export awards to CSV"""
+    return stream_csv("awards", accept_encoding)
+
+
+def validate_export_request(request: ExportRequest) -> Optional[dict]:
+    """Check an export request's table and format, returning its validated filters"""
+    if request.data_type == SUMMARY_REPORT:
+        if request.format != "pdf":
+            raise HTTPException(status_code=400, detail="The summary report is only available as pdf")
+        if request.filters:
+            raise HTTPException(status_code=400, detail="The summary report takes no filters")
+        return None
+    if request.data_type not in EXPORTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"data_type must be one of: {', '.join([*EXPORTS, SUMMARY_REPORT])}"
+        )
+    if request.format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+        )
     
-    output = io.StringIO()
-    writer = csv.writer(output)
+    try:
+        return validate_filters(request.data_type, request.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+# Single byte range ("bytes=start-end", "bytes=start-" or "bytes=-suffix")
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Bytes read per chunk when sending a job's file
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def parse_range(range_header: str, size: int) -> Optional[tuple]:
+    """Inclusive (start, end) byte offsets of a Range header, or None to send the whole file
     
-    # Write header
-    writer.writerow(['source', 'target', 'relationship', 'amount_usd', 'start_date', 'source_citation'])
+    Raises a 416 for ranges that lie outside the file. Multi-range
+    requests are answered with the whole file.
+    """
+    match = RANGE_PATTERN.match(range_header.strip())
+    if match is None:
+        return None
     
-    # Write data
-    for f in flows:
-        writer.writerow([
-            f.source, f.target, f.relationship, f.amount_usd,
-            f.start_date.isoformat() if f.start_date else '',
-            f.source_citation
-        ])
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
     
-    output.seek(0)
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=money_flows.csv"}
-    )
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
 
 
-@router.get("/csv/awards")
-async def export_awards_csv(
-    db: Session = Depends(get_db)
-):
-    """Export awards to CSV"""
-    awards = db.query(Award).all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'piid', 'recipient_name', 'recipient_uei', 'awarding_agency',
-        'award_amount', 'action_date', 'description', 'naics_code'
-    ])
-    
-    # Write data
-    for a in awards:
-        writer.writerow([
-            a.piid, a.recipient_name, a.recipient_uei, a.awarding_agency,
-            a.award_amount,
-            a.action_date.isoformat() if a.action_date else '',
-            a.description, a.naics_code
-        ])
-    
-    output.seek(0)
+def iter_file_range(path: str, start: int, end: int):
+    """Read bytes start..end (inclusive) of a file in chunks"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@router.post("")
+def export_filtered(request: ExportRequest, accept_encoding: Optional[str] = Header(None)):
+    """Export the rows of a dataset matching the /api/data list route filters"""
+    filters = validate_export_request(request)
+    return stream_export(request.data_type, request.format, filters, accept_encoding)
+
+
+@router.post("/jobs", response_model=ExportJobResponse, status_code=202)
+def create_export_job(request: ExportRequest):
+    """Generate an export in the background, for datasets too large to stream in one request
+    
+    Poll GET /jobs/{job_id} for progress, then fetch the file from its download_url.
+    The PDF summary report is requested as data_type "summary", format "pdf".
+    """
+    filters = validate_export_request(request)
+    extension = "pdf" if request.data_type == SUMMARY_REPORT else EXTENSIONS[request.format]
+    job = get_job_manager().submit(request.data_type, request.format, filters, extension)
+    return job.to_response()
+
+
+@router.get("/jobs/{job_id}", response_model=ExportJobResponse)
+def get_export_job(job_id: str):
+    """Status and progress of an export job"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job.to_response()
+
+
+@router.get("/jobs/{job_id}/download")
+def download_export_job(job_id: str, range_header: Optional[str] = Header(None, alias="Range")):
+    """Download a finished export job's file, resumable through HTTP Range requests"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    status = job.status
+    if status == "failed":
+        raise HTTPException(status_code=500, detail=f"Export job failed: {job.error}")
+    if status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export job is {status}")
+    
+    size = os.path.getsize(job.output_path)
+    byte_range = parse_range(range_header, size) if range_header else None
+    start, end = byte_range or (0, size - 1)
+    
+    if job.data_type == SUMMARY_REPORT:
+        media_type, filename = "application/pdf", "uap_summary.pdf"
+    else:
+        media_type = EXPORT_FORMATS[job.format]
+        filename = f"{EXPORTS[job.data_type].filename}.{EXTENSIONS[job.format]}"
+    
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(end - start + 1),
+    }
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=awards.csv"}
+        iter_file_range(job.output_path, start, end),
+        status_code=206 if byte_range is not None else 200,
+        media_type=media_type,
+        headers=headers
     )
 
 
+@router.get("/ndjson/{dataset}")
+def export_ndjson(dataset: str, accept_encoding: Optional[str] = Header(None)):
+    """Export a dataset as newline-delimited JSON"""
+    return stream_export(resolve_dataset(dataset), "ndjson", accept_encoding=accept_encoding)
+
+
+@router.get("/parquet/{dataset}")
+def export_parquet(dataset: str, accept_encoding: Optional[str] = Header(None)):
+    """Export a dataset as a Parquet file"""
+    return stream_export(resolve_dataset(dataset), "parquet", accept_encoding=accept_encoding)
+
+
+@router.get("/arrow/{dataset}")
+def export_arrow(dataset: str, accept_encoding: Optional[str] = Header(None)):
+    """Export a dataset as an Arrow IPC stream"""
+    return stream_export(resolve_dataset(dataset), "arrow", accept_encoding=accept_encoding)
+
+
 @router.get("/json/entities")
-async def export_entities_json(
-    db: Session = Depends(get_db)
-):
+def export_entities_json(accept_encoding: Optional[str] = Header(None)):
     """Export entities to JSON"""
-    entities = db.query(Entity).all()
-    
-    data = [
-        {
-            "entity_id": e.entity_id,
-            "display_name": e.display_name,
-            "normalized_name": e.normalized_name,
-            "entity_type": e.entity_type
-        }
-        for e in entities
-    ]
-    
-    return Response(
-        content=json.dumps(data, indent=2),
-        media_type="application/json",
-        headers={"Content-Disposition": "attachment; filename=entities.json"}
-    )
+    # Only opens a connection on a cache miss, after cached_export has let go of its own
+    def build():
+        with read_session() as db:
+            entities = db.query(Entity).all()
+        
+        data = [
+            {
+                "entity_id": e.entity_id,
+                "display_name": e.display_name,
+                "normalized_name": e.normalized_name,
+                "entity_type": e.entity_type
+            }
+            for e in entities
+        ]
+        return [json.dumps(data, indent=2)]
+    
+    return cached_export(("json", "entities"), "json", "application/json", "entities.json", build, accept_encoding)
 
 
 @router.get("/json/money-flows")
-async def export_money_flows_json(
-    db: Session = Depends(get_db)
-):
+def export_money_flows_json(accept_encoding: Optional[str] = Header(None)):
     """Export money flows to JSON"""
-    flows = db.query(MoneyFlow).all()
-    
-    data = [
-        {
-            "source": f.source,
-            "target": f.target,
-            "relationship": f.relationship,
-            "amount_usd": f.amount_usd,
-            "start_date": f.start_date.isoformat() if f.start_date else None,
-            "source_citation": f.source_citation
-        }
-        for f in flows
-    ]
-    
-    return Response(
-        content=json.dumps(data, indent=2),
-        media_type="application/json",
-        headers={"Content-Disposition": "attachment; filename=money_flows.json"}
-    )
+    # Only opens a connection on a cache miss, after cached_export has let go of its own
+    def build():
+        with read_session() as db:
+            flows = db.query(MoneyFlow).all()
+        
+        data = [
+            {
+                "source": f.source,
+                "target": f.target,
+                "relationship": f.relationship,
+                "amount_usd": f.amount_usd,
+                "start_date": f.start_date.isoformat() if f.start_date else None,
+                "source_citation": f.source_citation
+            }
+            for f in flows
+        ]
+        return [json.dumps(data, indent=2)]
+    
+    return cached_export(("json", "money_flows"), "json", "application/json", "money_flows.json", build, accept_encoding)
 
 
 @router.get("/pdf/summary")
-async def export_summary_pdf(
-    db: Session = Depends(get_db)
-):
-    """Export summary report to PDF"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    story = []
-    styles = getSampleStyleSheet()
-    
-    # Title
-    title = Paragraph("Project RawHorse - Summary Report", styles['Title'])
-    story.append(title)
-    story.append(Spacer(1, 12))
-    
-    # Get statistics
-    total_entities = db.query(Entity).count()
-    total_flows = db.query(MoneyFlow).count()
-    total_awards = db.query(Award).count()
-    
-    # Add statistics
-    stats_text = f"""
-    <b>Database Statistics:</b><br/>
-    Total Entities: {total_entities}<br/>
-    Total Money Flows: {total_flows}<br/>
-    Total Awards: {total_awards}<br/>
-    """
-    stats = Paragraph(stats_text, styles['Normal'])
-    story.append(stats)
-    story.append(Spacer(1, 12))
+def export_summary_pdf():
+    """Export summary report to PDF
     
-    # Top entities by money flow
-    story.append(Paragraph("<b>Top Entities by Money Flow:</b>", styles['Heading2']))
-    story.append(Spacer(1, 6))
-    
-    # Build PDF
-    doc.build(story)
-    buffer.seek(0)
+    The report is rendered in an export job worker process, keeping the
+    server responsive while it builds. Clients that would rather not wait
+    can submit it to POST /jobs instead.
+    """
+    job = get_job_manager().submit(SUMMARY_REPORT, "pdf")
+    try:
+        job.future.result()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Summary report failed: {e}")
     
-    return StreamingResponse(
-        iter([buffer.getvalue()]),
-        media_type="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=uap_summary.pdf"}
-    )
+    return FileResponse(job.output_path, media_type="application/pdf", filename="uap_summary.pdf")
@@ -0,0 +1,134 @@
+"""
+Full-text search indexes (SQLite FTS5) behind the `search` parameters of the data routes
+"""
+import logging
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy import Float, Integer, or_, text
+
+logger = logging.getLogger(__name__)
+
+
+class SearchIndex(NamedTuple):
+    """An external-content FTS5 table over some text columns of a data table"""
+    table_name: str
+    fts_name: str
+    columns: List[str]
+
+
+SEARCH_INDEXES: Dict[str, SearchIndex] = {
+    index.table_name: index
+    for index in [
+        SearchIndex("entities", "entities_fts", ["display_name", "normalized_name"]),
+        SearchIndex("money_flows", "money_flows_fts", ["source", "target", "relationship"]),
+        SearchIndex("awards", "awards_fts", ["recipient_name", "description"]),
+        SearchIndex("foia_targets", "foia_targets_fts", ["record_request", "notes"]),
+    ]
+}
+
+# The trigram tokenizer matches arbitrary substrings, like the `ilike('%term%')`
+# filters it replaces, but cannot match terms shorter than three characters
+TRIGRAM_MIN_LENGTH = 3
+
+# fts_name -> tokenizer in use, filled in as indexes are found
+_tokenizers: Dict[str, str] = {}
+
+
+def create_search_indexes(engine):
+    """Create any missing FTS5 tables and index the rows already present
+    
+    Uses the trigram tokenizer where the SQLite build supports it (3.34+),
+    otherwise unicode61 with prefix matching. Does nothing if FTS5 itself
+    is unavailable; searches then fall back to LIKE scans.
+    """
+    with engine.begin() as conn:
+        for index in SEARCH_INDEXES.values():
+            if _lookup_tokenizer(conn, index.fts_name):
+                continue
+            for tokenizer in ("trigram", "unicode61"):
+                try:
+                    conn.exec_driver_sql(
+                        f"CREATE VIRTUAL TABLE {index.fts_name} USING fts5("
+                        f"{', '.join(index.columns)}, content='{index.table_name}', "
+                        f"content_rowid='id', tokenize='{tokenizer}')"
+                    )
+                except Exception as e:
+                    logger.debug(f"Cannot create {index.fts_name} with {tokenizer} tokenizer: {e}")
+                    continue
+                rebuild_search_index(conn, index.table_name)
+                logger.info(f"Created search index {index.fts_name} ({tokenizer})")
+                break
+            else:
+                logger.warning(f"FTS5 unavailable, {index.table_name} search will scan the table")
+
+
+def rebuild_search_index(conn, table_name: str):
+    """Re-index a table after its rows were replaced
+    
+    Runs on the caller's connection so it can share the loader's transaction.
+    """
+    index = SEARCH_INDEXES.get(table_name)
+    if index is None or not _lookup_tokenizer(conn, index.fts_name):
+        return
+    conn.exec_driver_sql(f"INSERT INTO {index.fts_name}({index.fts_name}) VALUES('rebuild')")
+
+
+def _lookup_tokenizer(conn, fts_name: str) -> Optional[str]:
+    """Tokenizer of an existing FTS table, or None if the table doesn't exist"""
+    if fts_name in _tokenizers:
+        return _tokenizers[fts_name]
+    sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": fts_name},
+    ).scalar()
+    if sql is None:
+        return None
+    _tokenizers[fts_name] = "trigram" if "trigram" in sql else "unicode61"
+    return _tokenizers[fts_name]
+
+
+def build_match_expression(term: str, tokenizer: str) -> Optional[str]:
+    """Turn a user search term into an FTS5 MATCH expression
+    
+    Returns None when the index can't answer the term and the caller should
+    fall back to a LIKE scan.
+    """
+    term = term.strip()
+    if tokenizer == "trigram":
+        if len(term) < TRIGRAM_MIN_LENGTH:
+            return None
+        return '"' + term.replace('"', '""') + '"'
+    
+    tokens = ["".join(ch for ch in token if ch.isalnum()) for token in term.split()]
+    tokens = [token for token in tokens if token]
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def apply_search(query, model, term: str, ranked: bool = True):
+    """Filter a query to rows matching `term`, ordered by relevance
+    
+    Joins against the table's FTS index and, if `ranked`, orders by bm25
+    rank. Falls back to the original case-insensitive substring scan when
+    there is no usable index for the term.
+    """
+    index = SEARCH_INDEXES[model.__tablename__]
+    tokenizer = _lookup_tokenizer(query.session, index.fts_name)
+    match = build_match_expression(term, tokenizer) if tokenizer else None
+    
+    if match is None:
+        return query.filter(
+            or_(*[getattr(model, column).ilike(f"%{term}%") for column in index.columns])
+        )
+    
+    hits = (
+        text(
+            f"SELECT rowid, bm25({index.fts_name}) AS rank FROM {index.fts_name} "
+            f"WHERE {index.fts_name} MATCH :match"
+        )
+        .bindparams(match=match)
+        .columns(rowid=Integer, rank=Float)
+        .subquery(f"{index.fts_name}_hits")
+    )
+    query = query.join(hits, hits.c.rowid == model.id)
+    return query.order_by(hits.c.rank) if ranked else query
@@ -0,0 +1,123 @@
+"""
+Fast JSON responses for the list routes, built from column tuples instead of validated models
+"""
+import json
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, Response
+
+from models.schemas import GraphData, GraphNode, GraphEdge
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library encoder
+    orjson = None
+
+
+def response_fields(schema) -> List[str]:
+    """Fields a response model serializes, in output order"""
+    return list(schema.model_fields)
+
+
+def parse_fields(schema, fields: Optional[str]) -> List[str]:
+    """The fields of `schema` named in a comma-separated `fields=` parameter, in output order
+    
+    All fields when the parameter is absent.
+    """
+    all_fields = response_fields(schema)
+    if not fields:
+        return all_fields
+    
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(all_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}, expected any of: {', '.join(all_fields)}"
+        )
+    return [field for field in all_fields if field in requested]
+
+
+def row_columns(model, fields: List[str], sort_by: Optional[str] = None, sortable: List[str] = ()) -> list:
+    """Columns to select for `fields`, plus the id and sort column keyset pagination needs
+    
+    The extra columns come after the requested ones, so they are dropped
+    again by `rows_response`.
+    """
+    names = list(fields)
+    for extra in ("id", sort_by if sort_by in sortable else None):
+        if extra is not None and extra not in names:
+            names.append(extra)
+    return [getattr(model, name) for name in names]
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class RowsJSONResponse(Response):
+    """JSON response rendered with orjson when available, without any validation"""
+    media_type = "application/json"
+    
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def rows_response(rows, fields: List[str], response: Response) -> RowsJSONResponse:
+    """Serialize column-tuple rows selected by `row_columns` as objects of `fields`
+    
+    Matches what `response_model=List[schema]` would send for the same
+    rows, skipping per-row model validation. Headers already set on the
+    route's `response` (e.g. X-Next-Cursor) are carried over.
+    """
+    content = [dict(zip(fields, row)) for row in rows]
+    return RowsJSONResponse(content=content, headers=dict(response.headers))
+
+
+# The parts of a graph response and the model of their items
+GRAPH_PARTS = {"nodes": GraphNode, "edges": GraphEdge}
+
+
+def parse_graph_fields(fields: Optional[str]) -> Optional[Dict[str, List[str]]]:
+    """Node and edge fields named in a graph route's `fields=` parameter
+    
+    Items are `nodes.<field>` or `edges.<field>`; a part without any
+    listed fields keeps all of them. None when the parameter is absent.
+    """
+    if not fields:
+        return None
+    
+    selected = {part: [] for part in GRAPH_PARTS}
+    for item in (item.strip() for item in fields.split(",")):
+        if not item:
+            continue
+        part, _, field = item.partition(".")
+        if part not in GRAPH_PARTS or field not in GRAPH_PARTS[part].model_fields:
+            expected = [f"{p}.{f}" for p, model in GRAPH_PARTS.items() for f in model.model_fields]
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown field '{item}', expected any of: {', '.join(expected)}"
+            )
+        selected[part].append(field)
+    
+    return {
+        part: [f for f in response_fields(model) if f in selected[part]] if selected[part] else response_fields(model)
+        for part, model in GRAPH_PARTS.items()
+    }
+
+
+def graph_response(graph: GraphData, graph_fields: Optional[Dict[str, List[str]]]):
+    """A graph as-is, or projected to the fields from `parse_graph_fields`"""
+    if graph_fields is None:
+        return graph
+    
+    content = {
+        part: [{field: getattr(item, field) for field in graph_fields[part]} for item in getattr(graph, part)]
+        for part in GRAPH_PARTS
+    }
+    return RowsJSONResponse(content=content)
@@ -0,0 +1,170 @@
+"""
+Aggregation cube over awards and money flows, answered from pre-aggregated partial tables
+"""
+import re
+import logging
+import time
+from typing import Dict, List, NamedTuple, Optional, Union
+from sqlalchemy import Integer, String, cast, delete, func, insert, select
+
+from database import Award, AwardCube, FlowCube, MoneyFlow
+
+logger = logging.getLogger(__name__)
+
+
+class CubeSpec(NamedTuple):
+    """A fact table and the cube table holding its partial aggregates"""
+    fact_model: type
+    cube_model: type
+    dimensions: List[str]
+    date_column: str
+    amount_column: str
+
+
+CUBES: Dict[str, CubeSpec] = {
+    "awards": CubeSpec(
+        Award, AwardCube,
+        ["awarding_agency", "funding_agency", "naics_code", "psc_code"],
+        "action_date", "award_amount",
+    ),
+    "money_flows": CubeSpec(
+        MoneyFlow, FlowCube,
+        ["source", "target", "relationship"],
+        "start_date", "amount_usd",
+    ),
+}
+
+# Pseudo dimension grouping by the fact's date at the requested granularity
+PERIOD = "period"
+GRANULARITIES = ["year", "quarter", "month"]
+MEASURES = ["count", "sum", "avg", "min", "max"]
+
+MAX_CUBE_ROWS = 10000
+
+# Period bounds accepted by `start` / `end`: YYYY or YYYY-MM
+PERIOD_BOUND = re.compile(r"^\d{4}(-(0[1-9]|1[0-2]))?$")
+
+
+def refresh_cube(conn, fact: str) -> int:
+    """Recompute a fact table's cube of partial aggregates per dimension values and month"""
+    started = time.perf_counter()
+    spec = CUBES[fact]
+    fact_model, cube_table = spec.fact_model, spec.cube_model.__table__
+    amount = getattr(fact_model, spec.amount_column)
+    month = func.strftime('%Y-%m', getattr(fact_model, spec.date_column))
+    keys = [getattr(fact_model, d) for d in spec.dimensions] + [month]
+    
+    query = select(
+        *keys,
+        func.count(fact_model.id), func.count(amount), func.sum(amount), func.min(amount), func.max(amount),
+    ).group_by(*keys)
+    
+    conn.execute(delete(cube_table))
+    conn.execute(insert(cube_table).from_select(
+        spec.dimensions + ["month", "row_count", "amount_count", "total_amount", "min_amount", "max_amount"],
+        query,
+    ))
+    
+    count = conn.execute(select(func.count(cube_table.c.id))).scalar()
+    logger.info(f"Computed {count} {cube_table.name} cells in {time.perf_counter() - started:.2f}s")
+    return count
+
+
+def _period(month, granularity: str):
+    """Period key of a YYYY-MM month column at a granularity"""
+    if granularity == "month":
+        return month
+    year = func.substr(month, 1, 4)
+    if granularity == "year":
+        return year
+    quarter = (cast(func.substr(month, 6, 2), Integer) + 2) // 3
+    return year + "-Q" + cast(quarter, String)
+
+
+def _measure(cube, measure: str):
+    if measure == "count":
+        return func.sum(cube.row_count)
+    if measure == "sum":
+        return func.sum(cube.total_amount)
+    if measure == "avg":
+        return func.sum(cube.total_amount) / func.nullif(func.sum(cube.amount_count), 0)
+    if measure == "min":
+        return func.min(cube.min_amount)
+    return func.max(cube.max_amount)
+
+
+def query_cube(
+    db,
+    fact: str,
+    group_by: List[str],
+    measures: List[str],
+    filters: Optional[Dict[str, Union[str, List[str]]]] = None,
+    granularity: str = "month",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    sort_desc: bool = True,
+    limit: int = 1000,
+) -> List[dict]:
+    """Aggregate a fact table's cube along `group_by` dimensions
+    
+    `filters` restrict dimensions to a value or list of values, and
+    `start` / `end` bound the period (YYYY or YYYY-MM, inclusive). Rows are
+    sorted by `sort_by` (a group-by dimension or measure, by default the
+    first measure), or by the dimensions if there are no measures.
+    
+    Raises:
+        ValueError: if any part of the query doesn't fit the fact's cube
+    """
+    if fact not in CUBES:
+        raise ValueError(f"fact must be one of: {', '.join(CUBES)}")
+    spec = CUBES[fact]
+    cube = spec.cube_model
+    allowed = spec.dimensions + [PERIOD]
+    
+    for dimension in group_by:
+        if dimension not in allowed:
+            raise ValueError(f"Cannot group {fact} by '{dimension}', expected one of: {', '.join(allowed)}")
+    for measure in measures:
+        if measure not in MEASURES:
+            raise ValueError(f"Unknown measure '{measure}', expected one of: {', '.join(MEASURES)}")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    for bound in (start, end):
+        if bound is not None and not PERIOD_BOUND.match(bound):
+            raise ValueError(f"Invalid period bound '{bound}', expected YYYY or YYYY-MM")
+    
+    columns = {
+        dimension: (_period(cube.month, granularity) if dimension == PERIOD else getattr(cube, dimension)).label(dimension)
+        for dimension in dict.fromkeys(group_by)
+    }
+    columns.update({measure: _measure(cube, measure).label(measure) for measure in dict.fromkeys(measures)})
+    if not columns:
+        raise ValueError("Nothing to aggregate, give at least one group_by dimension or measure")
+    
+    query = select(*columns.values())
+    for dimension, value in (filters or {}).items():
+        if dimension not in spec.dimensions:
+            raise ValueError(f"Cannot filter {fact} by '{dimension}', expected one of: {', '.join(spec.dimensions)}")
+        column = getattr(cube, dimension)
+        query = query.where(column.in_(value) if isinstance(value, list) else column == value)
+    if start is not None:
+        query = query.where(cube.month >= start)
+    if end is not None:
+        query = query.where(cube.month <= (end if len(end) > 4 else f"{end}-12"))
+    
+    dimension_columns = [columns[d] for d in dict.fromkeys(group_by)]
+    if dimension_columns:
+        query = query.group_by(*dimension_columns)
+    
+    if sort_by is None:
+        sort_by = measures[0] if measures else None
+    if sort_by is not None:
+        if sort_by not in columns:
+            raise ValueError(f"Cannot sort by '{sort_by}', expected one of: {', '.join(columns)}")
+        sort_column = columns[sort_by]
+        query = query.order_by(sort_column.desc() if sort_desc else sort_column.asc(), *dimension_columns)
+    else:
+        query = query.order_by(*dimension_columns)
+    
+    return [dict(row._mapping) for row in db.execute(query.limit(min(limit, MAX_CUBE_ROWS)))]
@@ -0,0 +1,146 @@
+"""
+On-disk cache of generated export files, keyed on the dataset version
+"""
+import os
+import gzip
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MB = 512
+
+# Formats that are worth storing a gzip copy of (Parquet pages are already compressed)
+GZIP_FORMATS = {"csv", "json", "ndjson"}
+
+
+class CachedExport(NamedTuple):
+    path: str
+    gzip_path: Optional[str]
+
+
+def cache_key(*parts) -> str:
+    """Stable key for an export's parameters (format, table, filters, ...)"""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+class ExportCache:
+    """Export files of the current dataset version, evicted least recently used first
+    
+    Entries are named `<version>-<key>.<ext>`, so files generated from an
+    older version of the data are never served and are removed as soon as
+    an export of the new version is stored. Text formats also keep a gzip
+    copy that is sent as-is to clients accepting gzip.
+    """
+    
+    def __init__(self, cache_dir: str, max_mb: int = DEFAULT_MAX_MB, use_gzip: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        self.use_gzip = use_gzip
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def _path(self, version: str, key: str, extension: str) -> str:
+        return os.path.join(self.cache_dir, f"{version}-{key}.{extension}")
+    
+    def lookup(self, version: str, key: str, extension: str) -> Optional[CachedExport]:
+        """The cached files for an export, marking them recently used, or None on a miss"""
+        path = self._path(version, key, extension)
+        gzip_path = f"{path}.gz"
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        
+        if os.path.exists(gzip_path):
+            os.utime(gzip_path)
+        else:
+            gzip_path = None
+        return CachedExport(path, gzip_path)
+    
+    def store(self, version: str, key: str, extension: str, fmt: str, chunks: Iterable) -> Iterator[bytes]:
+        """Pass an export's chunks through while writing them to the cache
+        
+        The entry only becomes visible once every chunk has been written; an
+        abandoned download (e.g. the client disconnects) leaves nothing behind.
+        """
+        path = self._path(version, key, extension)
+        part_path = f"{path}.{uuid.uuid4().hex}.part"
+        gzip_part_path = f"{part_path}.gz" if self.use_gzip and fmt in GZIP_FORMATS else None
+        
+        completed = False
+        out = open(part_path, "wb")
+        gz_out = gzip.GzipFile(gzip_part_path, "wb", mtime=0) if gzip_part_path else None
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                out.write(chunk)
+                if gz_out is not None:
+                    gz_out.write(chunk)
+                yield chunk
+            completed = True
+        finally:
+            out.close()
+            if gz_out is not None:
+                gz_out.close()
+            
+            if completed:
+                if gzip_part_path:
+                    os.replace(gzip_part_path, f"{path}.gz")
+                os.replace(part_path, path)
+                self._evict(version)
+            else:
+                for leftover in (part_path, gzip_part_path):
+                    if leftover and os.path.exists(leftover):
+                        os.remove(leftover)
+    
+    def _evict(self, version: str):
+        """Drop other versions' files, then the least recently used until under the size limit"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".part") or name.endswith(".part.gz"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if not name.startswith(f"{version}-"):
+                    self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+    
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+            logger.debug(f"Evicted cached export {os.path.basename(path)}")
+        except FileNotFoundError:
+            pass
+
+
+# Export cache of this process (set by main.py during startup, None when disabled)
+_cache: Optional[ExportCache] = None
+
+
+def set_export_cache(cache: Optional[ExportCache]):
+    global _cache
+    _cache = cache
+
+
+def get_export_cache() -> Optional[ExportCache]:
+    return _cache
@@ -0,0 +1,334 @@
+"""
+Background export jobs run in a process pool, with progress polling and file downloads
+"""
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional
+
+from models.schemas import ExportJobResponse
+
+logger = logging.getLogger(__name__)
+
+# Pseudo data type of the PDF summary report job
+SUMMARY_REPORT = "summary"
+
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_RETENTION_MINUTES = 60
+
+# Seconds between progress file updates written by a running job
+PROGRESS_INTERVAL = 0.5
+
+# Seconds between sweeps of the jobs directory for expired job files
+SWEEP_INTERVAL = 60
+
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+# Database sessions of the current worker process, set up on its first job
+_worker_db_path = None
+
+
+def _init_worker_db(db_path: str, performance: Optional[dict]):
+    """Point the worker process's read sessions at the application database"""
+    global _worker_db_path
+    if _worker_db_path == db_path:
+        return
+    
+    from database import init_read_engine, get_session_maker
+    from dependencies import set_session_local
+    
+    set_session_local(get_session_maker(init_read_engine(db_path, performance)))
+    _worker_db_path = db_path
+
+
+def _write_progress(progress_path: str, **values):
+    """Atomically replace a job's progress file"""
+    tmp_path = f"{progress_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(values, f)
+    os.replace(tmp_path, progress_path)
+
+
+def run_export_job(
+    data_type: str,
+    fmt: str,
+    filters: Optional[dict],
+    output_path: str,
+    db_path: str,
+    performance: Optional[dict] = None,
+) -> int:
+    """Generate an export artifact; runs in a job worker process
+    
+    Writes to a `.part` file that is renamed into place on success, and
+    keeps a `.progress` JSON file next to it up to date for polling.
+    
+    Returns:
+        Size of the finished artifact in bytes
+    """
+    progress_path = f"{output_path}.progress"
+    try:
+        return _run_export(data_type, fmt, filters, output_path, progress_path, db_path, performance)
+    except Exception as e:
+        # Record the failure for server processes that don't hold this job's future
+        _write_progress(progress_path, error=str(e))
+        raise
+
+
+def _run_export(data_type, fmt, filters, output_path, progress_path, db_path, performance) -> int:
+    from services.exporter import build_summary_pdf, count_export_rows, iter_export
+    
+    _init_worker_db(db_path, performance)
+    part_path = f"{output_path}.part"
+    
+    if data_type == SUMMARY_REPORT:
+        _write_progress(progress_path, rows_written=0, total_rows=None)
+        with open(part_path, "wb") as f:
+            f.write(build_summary_pdf())
+    else:
+        total_rows = count_export_rows(data_type, filters)
+        state = {"rows_written": 0, "last_write": 0.0}
+        _write_progress(progress_path, rows_written=0, total_rows=total_rows)
+        
+        def on_batch(rows: int):
+            state["rows_written"] += rows
+            now = time.monotonic()
+            if now - state["last_write"] >= PROGRESS_INTERVAL:
+                _write_progress(progress_path, rows_written=state["rows_written"], total_rows=total_rows)
+                state["last_write"] = now
+        
+        with open(part_path, "wb") as f:
+            for chunk in iter_export(data_type, fmt, filters, progress=on_batch):
+                f.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        _write_progress(progress_path, rows_written=state["rows_written"], total_rows=total_rows)
+    
+    os.replace(part_path, output_path)
+    return os.path.getsize(output_path)
+
+
+class ExportJob:
+    """A submitted export and the future of its worker process
+    
+    Jobs submitted through another server process have no future here; their
+    state is read from the files their worker writes instead.
+    """
+    
+    def __init__(
+        self,
+        job_id: str,
+        data_type: str,
+        fmt: str,
+        filters: Optional[dict],
+        output_path: str,
+        future: Optional[Future] = None,
+        created_at: Optional[float] = None,
+    ):
+        self.job_id = job_id
+        self.data_type = data_type
+        self.format = fmt
+        self.filters = filters
+        self.output_path = output_path
+        self.future = future
+        self.created_at = created_at or time.time()
+    
+    @property
+    def status(self) -> str:
+        if self.future is None:
+            if os.path.exists(self.output_path):
+                return "completed"
+            return "failed" if "error" in self.read_progress() else "running"
+        if not self.future.done():
+            return "running" if self.future.running() else "queued"
+        return "failed" if self.future.exception() is not None else "completed"
+    
+    @property
+    def error(self) -> Optional[str]:
+        if self.future is None:
+            return self.read_progress().get("error")
+        if self.future.done() and self.future.exception() is not None:
+            return str(self.future.exception())
+        return None
+    
+    def read_progress(self) -> dict:
+        try:
+            with open(f"{self.output_path}.progress") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def to_response(self) -> ExportJobResponse:
+        status = self.status
+        progress = self.read_progress()
+        rows_written = progress.get("rows_written", 0)
+        total_rows = progress.get("total_rows")
+        
+        if status == "completed":
+            percent = 100.0
+        elif total_rows:
+            percent = round(100.0 * rows_written / total_rows, 1)
+        else:
+            percent = 0.0
+        
+        return ExportJobResponse(
+            job_id=self.job_id,
+            status=status,
+            data_type=self.data_type,
+            format=self.format,
+            filters=self.filters,
+            rows_written=rows_written,
+            total_rows=total_rows,
+            percent=percent,
+            size_bytes=os.path.getsize(self.output_path) if status == "completed" else None,
+            error=self.error if status == "failed" else None,
+            download_url=f"/api/export/jobs/{self.job_id}/download" if status == "completed" else None,
+        )
+
+
+class ExportJobManager:
+    """Runs export jobs in a pool of worker processes and tracks their artifacts
+    
+    A job's files are deleted once none of them has been written for
+    `retention_minutes`, whichever server process or run submitted it.
+    """
+    
+    def __init__(
+        self,
+        jobs_dir: str,
+        db_path: str,
+        performance: Optional[dict] = None,
+        workers: int = DEFAULT_JOB_WORKERS,
+        retention_minutes: int = DEFAULT_RETENTION_MINUTES,
+    ):
+        self.jobs_dir = jobs_dir
+        self.db_path = db_path
+        self.performance = performance
+        self.retention_seconds = retention_minutes * 60
+        os.makedirs(jobs_dir, exist_ok=True)
+        
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self._jobs: Dict[str, ExportJob] = {}
+        self._lock = threading.Lock()
+        self._swept_at = 0.0
+        self._expire_jobs()
+    
+    def submit(self, data_type: str, fmt: str, filters: Optional[dict] = None, extension: Optional[str] = None) -> ExportJob:
+        """Queue an export and return its job"""
+        self._expire_jobs()
+        
+        job_id = uuid.uuid4().hex
+        output_path = os.path.join(self.jobs_dir, f"{job_id}.{extension or fmt}")
+        future = self._pool.submit(
+            run_export_job, data_type, fmt, filters, output_path, self.db_path, self.performance
+        )
+        job = ExportJob(job_id, data_type, fmt, filters, output_path, future)
+        future.add_done_callback(lambda f: self._log_finished(job))
+        
+        # Let other server processes sharing the jobs directory find the job
+        with open(self._meta_path(job_id), "w") as f:
+            json.dump({
+                "data_type": data_type, "format": fmt, "filters": filters,
+                "output_path": output_path, "created_at": job.created_at,
+            }, f)
+        
+        with self._lock:
+            self._jobs[job_id] = job
+        return job
+    
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        """A job submitted through this or another server process"""
+        self._expire_jobs()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or not JOB_ID_PATTERN.match(job_id):
+            return job
+        
+        try:
+            with open(self._meta_path(job_id)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return ExportJob(
+            job_id, meta["data_type"], meta["format"], meta["filters"], meta["output_path"],
+            created_at=meta["created_at"],
+        )
+    
+    def _meta_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.job.json")
+    
+    def _log_finished(self, job: ExportJob):
+        error = job.future.exception()
+        if error is not None:
+            logger.error(f"Export job {job.job_id} ({job.data_type}/{job.format}) failed: {error}")
+        else:
+            logger.info(f"Export job {job.job_id} ({job.data_type}/{job.format}) finished")
+    
+    def _expire_jobs(self):
+        """Delete the files of jobs untouched for the retention period, at most once per SWEEP_INTERVAL
+        
+        Sweeps the jobs directory rather than this process's jobs, so files
+        left by other server processes and earlier runs are cleaned up too.
+        """
+        now = time.time()
+        with self._lock:
+            if now - self._swept_at < SWEEP_INTERVAL:
+                return
+            self._swept_at = now
+        
+        cutoff = now - self.retention_seconds
+        job_files: Dict[str, list] = {}
+        last_written: Dict[str, float] = {}
+        try:
+            entries = list(os.scandir(self.jobs_dir))
+        except OSError as e:
+            logger.warning(f"Cannot sweep export jobs in {self.jobs_dir}: {e}")
+            return
+        for entry in entries:
+            job_id = entry.name.split(".", 1)[0]
+            if not JOB_ID_PATTERN.match(job_id):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue  # Removed by another process's sweep meanwhile
+            job_files.setdefault(job_id, []).append(entry.path)
+            last_written[job_id] = max(last_written.get(job_id, 0.0), mtime)
+        
+        with self._lock:
+            expired = {job_id for job_id, mtime in last_written.items() if mtime < cutoff}
+            expired |= {job.job_id for job in self._jobs.values() if job.created_at < cutoff}
+            # Queued jobs write nothing until a worker picks them up
+            expired -= {job.job_id for job in self._jobs.values() if not job.future.done()}
+            for job_id in expired:
+                self._jobs.pop(job_id, None)
+        
+        for job_id in expired:
+            for path in job_files.get(job_id, ()):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+    
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Job manager of this process (set by main.py during startup)
+_manager: Optional[ExportJobManager] = None
+
+
+def set_job_manager(manager: Optional[ExportJobManager]):
+    global _manager
+    _manager = manager
+
+
+def get_job_manager() -> ExportJobManager:
+    if _manager is None:
+        raise RuntimeError("Export job manager not initialized")
+    return _manager
@@ -0,0 +1,277 @@
+"""
+Streaming export generation for the export routes
+"""
+import io
+import csv
+import json
+from datetime import date
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+from sqlalchemy import Date, Float, Integer
+
+from database import Entity, MoneyFlow, Award, FOIATarget
+from dependencies import read_session
+from filters import apply_filters
+
+# Rows fetched from SQLite and encoded per chunk of an export
+EXPORT_BATCH_SIZE = 2000
+
+
+class ExportSpec(NamedTuple):
+    """The table and columns an export reads, in output order"""
+    model: type
+    columns: List[str]
+    filename: str
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "entities": ExportSpec(
+        Entity,
+        ['entity_id', 'display_name', 'normalized_name', 'entity_type'],
+        "entities",
+    ),
+    "money_flows": ExportSpec(
+        MoneyFlow,
+        ['source', 'target', 'relationship', 'amount_usd', 'start_date', 'source_citation'],
+        "money_flows",
+    ),
+    "awards": ExportSpec(
+        Award,
+        ['piid', 'recipient_name', 'recipient_uei', 'awarding_agency',
+         'award_amount', 'action_date', 'description', 'naics_code'],
+        "awards",
+    ),
+    "foia_targets": ExportSpec(
+        FOIATarget,
+        ['agency', 'record_request', 'timeframe', 'relevance', 'notes'],
+        "foia_targets",
+    ),
+}
+
+# Streaming formats and the media type each is served with
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+class ExportFormatUnavailable(Exception):
+    """Raised when an export format's optional dependency is not installed"""
+
+
+def iter_export_batches(
+    data_type: str,
+    filters: Optional[dict] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+) -> Iterator[List[tuple]]:
+    """Yield an export's rows in batches without loading the whole table
+    
+    `filters` are validated list-route filters (see filters.validate_filters)
+    and are applied in SQL, so only matching rows are read. `progress` is
+    called with the size of each batch once it has been read. Opens its own
+    read session, because the response body is generated after the
+    request's dependencies have been torn down.
+    """
+    spec = EXPORTS[data_type]
+    with read_session() as db:
+        query = db.query(*[getattr(spec.model, c) for c in spec.columns])
+        query = apply_filters(query, data_type, filters, ranked=False).order_by(spec.model.id)
+        result = db.execute(query.statement.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            if progress is not None:
+                progress(len(partition))
+            yield partition
+
+
+def count_export_rows(data_type: str, filters: Optional[dict] = None) -> int:
+    """Number of rows an export will contain"""
+    spec = EXPORTS[data_type]
+    with read_session() as db:
+        return apply_filters(db.query(spec.model.id), data_type, filters, ranked=False).count()
+
+
+def iter_csv(data_type: str, filters: Optional[dict] = None, batch_size: int = EXPORT_BATCH_SIZE, progress=None) -> Iterator[str]:
+    """Stream an export as CSV text, one chunk per batch of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    writer.writerow(EXPORTS[data_type].columns)
+    yield buffer.getvalue()
+    
+    for batch in iter_export_batches(data_type, filters, batch_size, progress):
+        buffer.seek(0)
+        buffer.truncate()
+        # csv writes dates in ISO format and None as an empty field
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def iter_ndjson(data_type: str, filters: Optional[dict] = None, batch_size: int = EXPORT_BATCH_SIZE, progress=None) -> Iterator[str]:
+    """Stream an export as newline-delimited JSON, one object per row"""
+    columns = EXPORTS[data_type].columns
+    for batch in iter_export_batches(data_type, filters, batch_size, progress):
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default, separators=(",", ":")) + "\n"
+            for row in batch
+        )
+
+
+def iter_json(data_type: str, filters: Optional[dict] = None, batch_size: int = EXPORT_BATCH_SIZE, progress=None) -> Iterator[str]:
+    """Stream an export as a single JSON array of row objects"""
+    columns = EXPORTS[data_type].columns
+    separator = "["
+    for batch in iter_export_batches(data_type, filters, batch_size, progress):
+        yield separator + ",".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default, separators=(",", ":"))
+            for row in batch
+        )
+        separator = ","
+    yield "[]" if separator == "[" else "]"
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last drain"""
+    
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._position
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_schema(spec: ExportSpec):
+    """Arrow schema matching an export's column types"""
+    import pyarrow as pa
+    
+    fields = []
+    for name in spec.columns:
+        column_type = getattr(spec.model, name).type
+        if isinstance(column_type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column_type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column_type, Date):
+            arrow_type = pa.date32()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def iter_columnar(data_type: str, fmt: str, filters: Optional[dict] = None, batch_size: int = EXPORT_BATCH_SIZE, progress=None) -> Iterator[bytes]:
+    """Stream an export as a Parquet file or an Arrow IPC stream
+    
+    Each batch of rows becomes one Parquet row group or Arrow record batch,
+    which is flushed to the client before the next batch is read.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportFormatUnavailable(f"{fmt} export requires the pyarrow package")
+    
+    schema = _arrow_schema(EXPORTS[data_type])
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        write = writer.write_table
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write
+    
+    with writer:
+        for batch in iter_export_batches(data_type, filters, batch_size, progress):
+            columns = list(zip(*batch))
+            write(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_export(data_type: str, fmt: str, filters: Optional[dict] = None, batch_size: int = EXPORT_BATCH_SIZE, progress=None) -> Iterator:
+    """Chunks of an export in any of the EXPORT_FORMATS
+    
+    `progress` is called with the number of rows in each batch as it is read.
+    """
+    if fmt == "csv":
+        return iter_csv(data_type, filters, batch_size, progress)
+    if fmt == "json":
+        return iter_json(data_type, filters, batch_size, progress)
+    if fmt == "ndjson":
+        return iter_ndjson(data_type, filters, batch_size, progress)
+    if fmt in ("parquet", "arrow"):
+        # Check the optional dependency now, before the response starts
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ExportFormatUnavailable(f"{fmt} export requires the pyarrow package")
+        return iter_columnar(data_type, fmt, filters, batch_size, progress)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def build_summary_pdf() -> bytes:
+    """Render the summary report PDF"""
+    # reportlab is slow to import and only needed here
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+    
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    story = []
+    styles = getSampleStyleSheet()
+    
+    # Title
+    title = Paragraph("Project RawHorse - Summary Report", styles['Title'])
+    story.append(title)
+    story.append(Spacer(1, 12))
+    
+    # Get statistics
+    with read_session() as db:
+        total_entities = db.query(Entity).count()
+        total_flows = db.query(MoneyFlow).count()
+        total_awards = db.query(Award).count()
+    
+    # Add statistics
+    stats_text = f"""
+    <b>Database Statistics:</b><br/>
+    Total Entities: {total_entities}<br/>
+    Total Money Flows: {total_flows}<br/>
+    Total Awards: {total_awards}<br/>
+    """
+    stats = Paragraph(stats_text, styles['Normal'])
+    story.append(stats)
+    story.append(Spacer(1, 12))
+    
+    # Top entities by money flow
+    story.append(Paragraph("<b>Top Entities by Money Flow:</b>", styles['Heading2']))
+    story.append(Spacer(1, 6))
+    
+    # Build PDF
+    doc.build(story)
+    return buffer.getvalue()
@@ -6,15 +6,28 @@ import csv
 import hashlib
 from datetime import datetime
 from typing import Optional
-from github import Github, GithubException
 import io
 
 from models.schemas import EntityCreate, MoneyFlowCreate, AwardCreate, FOIATargetCreate
 
+# PyGithub (and requests under it) is slow to import and only the contribution
+# routes need it, so it is imported when the first GitHubService is created
+Github = None
+GithubException = None
+
+
+def _import_github():
+    """Bind PyGithub's client and exception class in this module, once"""
+    global Github, GithubException
+    if Github is None:
+        import github
+        Github, GithubException = github.Github, github.GithubException
+
 
 class GitHubService:
     def __init__(self, token: str, repo_url: str = "YOUR_ORG/UAPUFOResearch"):
         """Initialize GitHub service with token"""
+        _import_github()
         self.token = token
         self.github = Github(token)
         self.repo_name = repo_url
@@ -0,0 +1,311 @@
+"""
+Process-wide in-memory index of the entity relationship and money flow graphs
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Set
+from sqlalchemy.orm import Session
+
+from database import Entity, EntityMetric, MoneyFlow, Relationship
+from data_loader import infer_entity_type, get_dataset_version
+from models.schemas import GraphData, GraphNode, GraphEdge
+
+logger = logging.getLogger(__name__)
+
+
+class IndexedEntity(NamedTuple):
+    entity_id: str
+    display_name: str
+    normalized_name: str
+    entity_type: Optional[str]
+
+
+class RelationshipEdge(NamedTuple):
+    source: str
+    target: str
+    label: str
+
+
+class FlowEdge(NamedTuple):
+    id: int
+    source: str
+    target: str
+    relationship: Optional[str]
+    amount_usd: Optional[float]
+    start_date: Optional[date]
+    source_citation: Optional[str]
+
+
+class IndexedMetric(NamedTuple):
+    degree: int
+    in_flow: float
+    out_flow: float
+    pagerank: float
+    betweenness: float
+
+
+class GraphIndex:
+    """Entities, relationships and money flows of one dataset version, held in memory
+    
+    Edges reference entities by the names used in the source CSVs, which are
+    resolved against display name, lower-cased display name, normalized name
+    and entity id, in the same way the graph endpoints always have.
+    """
+    
+    def __init__(
+        self,
+        version: str,
+        entities: List[IndexedEntity],
+        relationships: List[RelationshipEdge],
+        flows: List[FlowEdge],
+        metrics: Optional[Dict[str, IndexedMetric]] = None,
+    ):
+        self.version = version
+        self.relationships = relationships
+        self.flows = flows
+        self.metrics = metrics or {}
+        self.max_pagerank = max((m.pagerank for m in self.metrics.values()), default=0.0)
+        
+        self.entities_by_key: Dict[str, IndexedEntity] = {}
+        for e in entities:
+            if e.display_name:
+                self.entities_by_key[e.display_name] = e
+                self.entities_by_key[e.display_name.lower()] = e
+            if e.normalized_name:
+                self.entities_by_key[e.normalized_name] = e
+            self.entities_by_key[e.entity_id] = e
+        
+        # Adjacency by node name, in both directions
+        self.relationships_out: Dict[str, List[RelationshipEdge]] = defaultdict(list)
+        self.relationships_in: Dict[str, List[RelationshipEdge]] = defaultdict(list)
+        for r in relationships:
+            self.relationships_out[r.source].append(r)
+            self.relationships_in[r.target].append(r)
+        
+        self.flows_out: Dict[str, List[FlowEdge]] = defaultdict(list)
+        self.flows_in: Dict[str, List[FlowEdge]] = defaultdict(list)
+        for f in flows:
+            self.flows_out[f.source].append(f)
+            self.flows_in[f.target].append(f)
+        
+        # Case-insensitive lookup of the node names edges actually use
+        self.nodes_by_lower: Dict[str, Set[str]] = defaultdict(set)
+        for name in (*self.relationships_out, *self.relationships_in, *self.flows_out, *self.flows_in):
+            self.nodes_by_lower[name.lower()].add(name)
+        
+        self._types: Dict[str, str] = {}
+        self._strongest_flows: Dict[str, List[FlowEdge]] = {}
+        self._entity_graphs: Dict[int, GraphData] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def build(cls, db: Session, version: str) -> "GraphIndex":
+        """Read the graph tables into a new index"""
+        entities = [
+            IndexedEntity(*row)
+            for row in db.query(Entity.entity_id, Entity.display_name, Entity.normalized_name, Entity.entity_type)
+        ]
+        relationships = [
+            RelationshipEdge(*row)
+            for row in db.query(Relationship.source, Relationship.target, Relationship.label).order_by(Relationship.id)
+        ]
+        flows = [
+            FlowEdge(*row)
+            for row in db.query(
+                MoneyFlow.id, MoneyFlow.source, MoneyFlow.target, MoneyFlow.relationship,
+                MoneyFlow.amount_usd, MoneyFlow.start_date, MoneyFlow.source_citation,
+            ).order_by(MoneyFlow.id)
+        ]
+        metrics = {
+            name: IndexedMetric(*values)
+            for name, *values in db.query(
+                EntityMetric.name, EntityMetric.degree, EntityMetric.in_flow,
+                EntityMetric.out_flow, EntityMetric.pagerank, EntityMetric.betweenness,
+            )
+        }
+        return cls(version, entities, relationships, flows, metrics)
+    
+    def resolve(self, name: str) -> Optional[IndexedEntity]:
+        """Find the entity an edge endpoint name refers to"""
+        return self.entities_by_key.get(name) or self.entities_by_key.get(name.lower())
+    
+    def strongest_flows_out(self, node: str) -> List[FlowEdge]:
+        """Largest outgoing money flow to each distinct target, memoized per node"""
+        flows = self._strongest_flows.get(node)
+        if flows is None:
+            best: Dict[str, FlowEdge] = {}
+            for f in self.flows_out.get(node, ()):
+                current = best.get(f.target)
+                if current is None or (f.amount_usd or 0) > (current.amount_usd or 0):
+                    best[f.target] = f
+            flows = sorted(best.values(), key=lambda f: f.amount_usd or 0, reverse=True)
+            self._strongest_flows[node] = flows
+        return flows
+    
+    def find_nodes(self, name: str) -> List[str]:
+        """Graph node names that refer to `name`, either directly or via its entity record"""
+        keys = {name.lower()}
+        entity = self.resolve(name)
+        if entity is not None:
+            keys.update(k.lower() for k in (entity.display_name, entity.normalized_name, entity.entity_id) if k)
+        return sorted({node for key in keys for node in self.nodes_by_lower.get(key, ())})
+    
+    def entity_type(self, name: str) -> str:
+        """Entity type from the entities table, inferred from the name if unknown"""
+        entity_type = self._types.get(name)
+        if entity_type is None:
+            entity = self.resolve(name)
+            entity_type = entity.entity_type if entity and entity.entity_type else infer_entity_type(name)
+            self._types[name] = entity_type
+        return entity_type
+    
+    def node_size(self, name: str, connections: int) -> float:
+        """Display size of a node, from its precomputed PageRank when available
+        
+        Ranges from 8 to 25. Nodes without metrics fall back to the old
+        per-graph connection count: base 8, +3 per connection.
+        """
+        metric = self.metrics.get(name)
+        if metric is not None and self.max_pagerank > 0:
+            return round(8 + 17 * metric.pagerank / self.max_pagerank, 2)
+        return min(8 + (connections * 3), 25)
+    
+    def entity_graph(self, limit: int) -> GraphData:
+        """Graph of the first `limit * 2` relationships, memoized per limit"""
+        graph = self._entity_graphs.get(limit)
+        if graph is not None:
+            return graph
+        
+        relationships = self.relationships[:limit * 2]
+        
+        # Calculate connection counts
+        connection_counts: Dict[str, int] = defaultdict(int)
+        for r in relationships:
+            connection_counts[r.source] += 1
+            connection_counts[r.target] += 1
+        
+        # Create nodes - use entity names as IDs to match relationships
+        nodes = [
+            GraphNode(
+                id=entity_name,
+                name=entity_name,
+                type=self.entity_type(entity_name),
+                value=self.node_size(entity_name, connections)
+            )
+            for entity_name, connections in connection_counts.items()
+        ]
+        
+        edges = [GraphEdge(source=r.source, target=r.target, label=r.label) for r in relationships]
+        
+        graph = GraphData(nodes=nodes, edges=edges)
+        with self._lock:
+            self._entity_graphs[limit] = graph
+        return graph
+    
+    def ego_graph(
+        self,
+        centers: List[str],
+        depth: int,
+        max_neighbors: int,
+        min_amount: Optional[float] = None,
+        max_nodes: int = 500,
+    ) -> GraphData:
+        """Breadth-first neighbourhood of `centers` up to `depth` hops
+        
+        Both relationship and money flow edges are followed in either
+        direction. Each node expands to at most `max_neighbors` new nodes,
+        preferring the largest money flows, and flows below `min_amount`
+        are ignored. Expansion stops once `max_nodes` nodes are reached.
+        """
+        visited: Dict[str, int] = {center: 0 for center in centers}
+        edges: Dict[tuple, GraphEdge] = {}
+        frontier = list(centers)
+        
+        for hop in range(1, depth + 1):
+            next_frontier = []
+            for node in frontier:
+                added = 0
+                for neighbor, key, edge in self._neighbor_edges(node, min_amount):
+                    if neighbor not in visited:
+                        if added >= max_neighbors or len(visited) >= max_nodes:
+                            continue
+                        visited[neighbor] = hop
+                        next_frontier.append(neighbor)
+                        added += 1
+                    edges.setdefault(key, edge)
+            frontier = next_frontier
+            if not frontier:
+                break
+        
+        # Keep only edges whose endpoints both made it into the graph
+        edges = [e for e in edges.values() if e.source in visited and e.target in visited]
+        degree: Dict[str, int] = defaultdict(int)
+        for e in edges:
+            degree[e.source] += 1
+            degree[e.target] += 1
+        
+        nodes = [
+            GraphNode(
+                id=name,
+                name=name,
+                type=self.entity_type(name),
+                value=self.node_size(name, degree[name])
+            )
+            for name in visited
+        ]
+        return GraphData(nodes=nodes, edges=edges)
+    
+    def _neighbor_edges(self, node: str, min_amount: Optional[float]):
+        """(neighbor, dedup key, edge) for a node, largest money flows first"""
+        flows = [
+            (f.target if f.source == node else f.source, f)
+            for f in (*self.flows_out.get(node, ()), *self.flows_in.get(node, ()))
+            if min_amount is None or (f.amount_usd is not None and f.amount_usd >= min_amount)
+        ]
+        flows.sort(key=lambda item: item[1].amount_usd or 0, reverse=True)
+        for neighbor, f in flows:
+            yield neighbor, ("flow", f.id), GraphEdge(
+                source=f.source, target=f.target, value=f.amount_usd, label=f.relationship
+            )
+        
+        for r in (*self.relationships_out.get(node, ()), *self.relationships_in.get(node, ())):
+            neighbor = r.target if r.source == node else r.source
+            yield neighbor, ("relationship", r.source, r.target, r.label), GraphEdge(
+                source=r.source, target=r.target, label=r.label
+            )
+
+
+_index: Optional[GraphIndex] = None
+_build_lock = threading.Lock()
+
+
+def get_graph_index(db: Session) -> GraphIndex:
+    """The graph index for the currently loaded dataset, rebuilding it if stale
+    
+    Staleness is detected through the dataset version stamp, so a reload by
+    the loader (in this or another worker process) is picked up on the next
+    request without any explicit notification.
+    """
+    global _index
+    version = get_dataset_version(db)
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    
+    with _build_lock:
+        if _index is None or _index.version != version:
+            _index = GraphIndex.build(db, version)
+            logger.info(
+                f"Built graph index {version}: {len(_index.relationships)} relationships, "
+                f"{len(_index.flows)} money flows"
+            )
+        return _index
+
+
+def invalidate_graph_index():
+    """Drop the cached index so the next request rebuilds it"""
+    global _index
+    with _build_lock:
+        _index = None
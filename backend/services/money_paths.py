@@ -0,0 +1,112 @@
+"""
+Bounded path search over the money flow graph
+"""
+import heapq
+import time
+from typing import Dict, List, Tuple
+
+from models.schemas import MoneyPath, MoneyPathHop
+from services.graph_index import FlowEdge, GraphIndex
+
+PATH_MODES = ("shortest", "widest")
+
+# Upper bound on partial paths expanded by one search, on top of the time budget
+MAX_EXPANSIONS = 200000
+
+
+def find_money_paths(
+    index: GraphIndex,
+    sources: List[str],
+    targets: List[str],
+    mode: str = "shortest",
+    k: int = 1,
+    max_hops: int = 6,
+    min_amount: float = None,
+    time_budget: float = 1.0,
+) -> Tuple[List[MoneyPath], bool]:
+    """Find up to `k` simple money flow paths from any source node to any target node
+    
+    Edges are followed in the direction money moves. Parallel flows between
+    the same pair are collapsed to the largest one. In "shortest" mode paths
+    come back by fewest hops (widest first among equals); in "widest" mode
+    by largest bottleneck amount (fewest hops first among equals).
+    
+    The search is best-first, so the first `k` paths reaching a target are
+    the best `k`. Each node is expanded at most `k` times, and the search
+    gives up once `time_budget` seconds or MAX_EXPANSIONS expansions are
+    spent.
+    
+    Returns:
+        The paths found and whether the search was cut short
+    """
+    if mode not in PATH_MODES:
+        raise ValueError(f"Unknown path mode '{mode}', expected one of: {', '.join(PATH_MODES)}")
+    
+    deadline = time.perf_counter() + time_budget
+    target_set = set(targets)
+    
+    def priority(hops: int, bottleneck: float) -> tuple:
+        return (hops, -bottleneck) if mode == "shortest" else (-bottleneck, hops)
+    
+    # Heap entries: (priority, tiebreak, node, path edges, nodes on path, bottleneck)
+    heap = []
+    counter = 0
+    for source in sources:
+        heapq.heappush(heap, (priority(0, float("inf")), counter, source, (), frozenset([source]), float("inf")))
+        counter += 1
+    
+    expansions: Dict[str, int] = {}
+    paths: List[MoneyPath] = []
+    truncated = False
+    total_expanded = 0
+    
+    while heap and len(paths) < k:
+        if time.perf_counter() > deadline or total_expanded >= MAX_EXPANSIONS:
+            truncated = True
+            break
+        
+        _, _, node, edges, on_path, bottleneck = heapq.heappop(heap)
+        
+        if edges and node in target_set:
+            paths.append(_to_money_path(edges, bottleneck))
+            continue
+        
+        if expansions.get(node, 0) >= k or len(edges) >= max_hops:
+            continue
+        expansions[node] = expansions.get(node, 0) + 1
+        total_expanded += 1
+        
+        for flow in index.strongest_flows_out(node):
+            amount = flow.amount_usd or 0.0
+            if min_amount is not None and amount < min_amount:
+                # Flows are sorted by amount, so the rest are smaller still
+                break
+            if flow.target in on_path:
+                continue
+            width = min(bottleneck, amount)
+            heapq.heappush(heap, (
+                priority(len(edges) + 1, width), counter, flow.target,
+                edges + (flow,), on_path | {flow.target}, width,
+            ))
+            counter += 1
+    
+    return paths, truncated
+
+
+def _to_money_path(edges: Tuple[FlowEdge, ...], bottleneck: float) -> MoneyPath:
+    """Response model for a path of flow edges"""
+    return MoneyPath(
+        hops=[
+            MoneyPathHop(
+                source=f.source,
+                target=f.target,
+                amount_usd=f.amount_usd,
+                start_date=f.start_date,
+                relationship=f.relationship,
+                source_citation=f.source_citation,
+            )
+            for f in edges
+        ],
+        total_amount=sum(f.amount_usd or 0.0 for f in edges),
+        bottleneck_amount=bottleneck,
+    )
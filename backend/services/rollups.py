@@ -0,0 +1,67 @@
+"""
+Materialized rollups of the data tables behind the stats, totals and timeline endpoints
+"""
+import logging
+import time
+from sqlalchemy import delete, func, insert, literal, select
+
+from database import Entity, MoneyFlow, Award, FOIATarget, Rollup
+
+logger = logging.getLogger(__name__)
+
+# Tables whose contents feed the rollups; reloading any of them refreshes them
+ROLLUP_TABLES = {"entities", "money_flows", "awards", "foia_targets"}
+
+# Rollup dimensions
+TABLE_TOTALS = "table"            # key: table name, with amount total and date range
+FLOWS_BY_YEAR = "flow_year"       # key: YYYY of start_date
+FLOWS_BY_MONTH = "flow_month"     # key: YYYY-MM of start_date
+FLOWS_BY_SOURCE = "flow_source"
+FLOWS_BY_TARGET = "flow_target"
+AWARDS_BY_AGENCY = "award_agency"
+
+
+def _group_rollup(dimension: str, key, model, amount, *criteria):
+    """INSERT ... SELECT of one grouped rollup dimension"""
+    query = select(
+        literal(dimension), key, func.count(model.id), func.sum(amount)
+    ).where(*criteria).group_by(key)
+    return insert(Rollup.__table__).from_select(["dimension", "key", "row_count", "total"], query)
+
+
+def refresh_rollups(conn) -> int:
+    """Recompute the rollups table: per-table totals and money flow sums by period, source and target"""
+    started = time.perf_counter()
+    conn.execute(delete(Rollup.__table__))
+    
+    table_rows = []
+    for model, amount, date_column in [
+        (Entity, None, None),
+        (MoneyFlow, MoneyFlow.amount_usd, MoneyFlow.start_date),
+        (Award, Award.award_amount, Award.action_date),
+        (FOIATarget, None, None),
+    ]:
+        columns = [func.count(model.id)]
+        if amount is not None:
+            columns += [func.sum(amount), func.min(date_column), func.max(date_column)]
+        values = conn.execute(select(*columns)).one()
+        row = {"dimension": TABLE_TOTALS, "key": model.__tablename__, "row_count": values[0],
+               "total": None, "min_date": None, "max_date": None}
+        if amount is not None:
+            row.update(total=values[1], min_date=values[2], max_date=values[3])
+        table_rows.append(row)
+    conn.execute(insert(Rollup.__table__), table_rows)
+    
+    dated = MoneyFlow.start_date.isnot(None)
+    for statement in [
+        _group_rollup(FLOWS_BY_YEAR, func.strftime('%Y', MoneyFlow.start_date), MoneyFlow, MoneyFlow.amount_usd, dated),
+        _group_rollup(FLOWS_BY_MONTH, func.strftime('%Y-%m', MoneyFlow.start_date), MoneyFlow, MoneyFlow.amount_usd, dated),
+        _group_rollup(FLOWS_BY_SOURCE, MoneyFlow.source, MoneyFlow, MoneyFlow.amount_usd),
+        _group_rollup(FLOWS_BY_TARGET, MoneyFlow.target, MoneyFlow, MoneyFlow.amount_usd),
+        _group_rollup(AWARDS_BY_AGENCY, Award.awarding_agency, Award, Award.award_amount),
+    ]:
+        conn.execute(statement)
+    
+    count = conn.execute(select(func.count(Rollup.id))).scalar()
+    logger.info(f"Computed {count} rollup rows in {time.perf_counter() - started:.2f}s")
+    return count
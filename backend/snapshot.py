@@ -0,0 +1,137 @@
+"""
+Prebuilt database snapshots shipped with the executable, so a fresh install doesn't load the CSVs on first launch
+"""
+import os
+import json
+import time
+import shutil
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Optional
+
+from database import init_database, get_session_maker, SourceManifest
+from data_loader import DATA_SOURCES, get_source_path, hash_file, load_all_data
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DB = "prh.db"
+SNAPSHOT_MANIFEST = "manifest.json"
+
+
+def build_snapshot(config: dict, project_root: str, snapshot_dir: str) -> dict:
+    """Load every source CSV into a new database and write it, compacted, to `snapshot_dir`
+    
+    The snapshot holds everything the loader derives from the data (search
+    indexes, entity metrics, rollups, cubes) and ANALYZE statistics for the
+    query planner. Next to it, a manifest records the app version and the
+    hash of every source file it was built from.
+    
+    Returns:
+        The manifest
+    """
+    started = time.perf_counter()
+    os.makedirs(snapshot_dir, exist_ok=True)
+    snapshot_path = os.path.join(snapshot_dir, SNAPSHOT_DB)
+    build_path = f"{snapshot_path}.build"
+    for path in (snapshot_path, build_path, f"{build_path}-wal", f"{build_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    
+    engine = init_database(build_path, config['database'].get('performance'))
+    db = get_session_maker(engine)()
+    try:
+        load_all_data(db, config, project_root)
+        sources = {
+            m.table_name: {"content_hash": m.content_hash, "row_count": m.row_count}
+            for m in db.query(SourceManifest).all()
+        }
+        db.commit()
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+            conn.commit()
+            # Writes a defragmented copy without free pages or the WAL
+            conn.exec_driver_sql("VACUUM INTO ?", (snapshot_path,))
+    finally:
+        db.close()
+        engine.dispose()
+    
+    for path in (build_path, f"{build_path}-wal", f"{build_path}-shm", f"{build_path}.load-lock"):
+        if os.path.exists(path):
+            os.remove(path)
+    
+    # Ship it in rollback-journal mode; the app switches to WAL when it opens the copy
+    with sqlite3.connect(snapshot_path) as conn:
+        conn.execute("PRAGMA journal_mode=DELETE")
+    
+    manifest = {
+        "app_version": config['app']['version'],
+        "built_at": datetime.utcnow().isoformat(),
+        "sources": sources,
+    }
+    with open(os.path.join(snapshot_dir, SNAPSHOT_MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    
+    size_mb = os.path.getsize(snapshot_path) / (1024 * 1024)
+    logger.info(f"Built database snapshot ({size_mb:.1f} MB) in {time.perf_counter() - started:.2f}s")
+    return manifest
+
+
+def read_snapshot_manifest(snapshot_dir: str) -> Optional[dict]:
+    """The manifest of the snapshot in `snapshot_dir`, or None if there is no complete snapshot"""
+    manifest_path = os.path.join(snapshot_dir, SNAPSHOT_MANIFEST)
+    if not os.path.exists(os.path.join(snapshot_dir, SNAPSHOT_DB)) or not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unreadable snapshot manifest {manifest_path}: {e}")
+        return None
+
+
+def snapshot_matches(manifest: dict, config: dict, project_root: str) -> bool:
+    """Whether a snapshot was built by this app version from the source files present now
+    
+    Source files that are absent here are not compared; the loader skips
+    those too, so the snapshot's copy of them stays in place either way.
+    """
+    if manifest.get("app_version") != config['app']['version']:
+        return False
+    
+    sources = manifest.get("sources") or {}
+    for source in DATA_SOURCES:
+        csv_path = get_source_path(source, config, project_root)
+        if not os.path.exists(csv_path):
+            continue
+        built_from = sources.get(source.table_name)
+        if built_from is None or built_from.get("content_hash") != hash_file(csv_path):
+            return False
+    return True
+
+
+def install_snapshot(snapshot_dir: str, db_path: str, config: dict, project_root: str) -> bool:
+    """Copy the shipped snapshot into place as the database, on first run only
+    
+    Nothing is copied if a database already exists or the snapshot doesn't
+    match the source files; the loader then builds or updates the database
+    from the CSVs as usual.
+    
+    Returns:
+        Whether the snapshot was installed
+    """
+    if os.path.exists(db_path):
+        return False
+    manifest = read_snapshot_manifest(snapshot_dir)
+    if manifest is None:
+        return False
+    if not snapshot_matches(manifest, config, project_root):
+        logger.info("Database snapshot doesn't match this version or the source files, loading from CSV")
+        return False
+    
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    part_path = f"{db_path}.part"
+    shutil.copyfile(os.path.join(snapshot_dir, SNAPSHOT_DB), part_path)
+    os.replace(part_path, db_path)
+    logger.info(f"Installed database snapshot built {manifest.get('built_at')}")
+    return True
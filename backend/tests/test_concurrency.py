@@ -0,0 +1,61 @@
+"""
+Concurrent GET requests against a read pool no larger than the thread pool
+"""
+import os
+import sys
+import asyncio
+import sqlite3
+
+import anyio
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import init_read_engine, get_session_maker
+from dependencies import get_read_db, set_query_timeout, set_read_session_local, set_session_local
+
+POOL_SIZE = 2
+REQUESTS = 20
+
+# Counts long enough that requests overlap, short enough to stay far inside the deadline
+SLOW_QUERY = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200000) SELECT count(*) FROM n"
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    
+    @app.get("/count")
+    def count(db: Session = Depends(get_read_db)):
+        return {"count": db.execute(text(SLOW_QUERY)).scalar()}
+    
+    return app
+
+
+def test_requests_dont_starve_the_read_pool(tmp_path):
+    db_path = str(tmp_path / "prh.db")
+    sqlite3.connect(db_path).close()
+    engine = init_read_engine(db_path, {"read_pool_size": POOL_SIZE})
+    session_maker = get_session_maker(engine)
+    set_session_local(session_maker)
+    set_read_session_local(session_maker)
+    set_query_timeout(10)
+    
+    async def run():
+        anyio.to_thread.current_default_thread_limiter().total_tokens = POOL_SIZE
+        transport = httpx.ASGITransport(app=build_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with anyio.fail_after(20):
+                return await asyncio.gather(*(client.get("/count") for _ in range(REQUESTS)))
+    
+    try:
+        responses = asyncio.run(run())
+    finally:
+        set_read_session_local(None)
+        set_query_timeout(None)
+        engine.dispose()
+    
+    assert [r.status_code for r in responses] == [200] * REQUESTS
+    assert all(r.json() == {"count": 200000} for r in responses)
@@ -45,6 +45,25 @@ def copy_frontend_build():
     return True
 
 
+def build_database_snapshot():
+    """Load the source CSVs into a compacted database snapshot shipped with the executable"""
+    print("Building database snapshot...")
+    
+    # The loader lives in the backend package, next to the modules it imports
+    sys.path.insert(0, str(Path("backend").absolute()))
+    import yaml
+    from snapshot import build_snapshot
+    
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    
+    manifest = build_snapshot(config, str(Path(".").absolute()), "snapshot")
+    for table_name, source in manifest["sources"].items():
+        print(f"  {table_name}: {source['row_count']} rows")
+    
+    return True
+
+
 def create_spec_file():
     """Create PyInstaller spec file"""
     spec_content = """
@@ -59,6 +78,7 @@ a = Analysis(
     datas=[
         ('backend', 'backend'),
         ('config.yaml', '.'),
+        ('snapshot', 'snapshot'),
         ('../UAPUFOResearch/UAPUFOResearch', 'UAPUFOResearch/UAPUFOResearch'),
     ],
     hiddenimports=[
@@ -168,12 +188,17 @@ def main():
             print("Failed to copy frontend build")
             return 1
         
-        # Step 3: Create spec file
+        # Step 3: Build database snapshot
+        if not build_database_snapshot():
+            print("Failed to build database snapshot")
+            return 1
+        
+        # Step 4: Create spec file
         if not create_spec_file():
             print("Failed to create spec file")
             return 1
         
-        # Step 4: Build executable
+        # Step 5: Build executable
         if not build_executable():
             print("Failed to build executable")
             return 1
@@ -188,7 +213,7 @@ def main():
         print("  2. Distribute as a ZIP or create an installer")
         
         return 0
-        
+    
     except Exception as e:
         print(f"\nBuild failed: {e}")
         return 1
@@ -4,11 +4,17 @@ Handles server startup and browser launching
 """
 import os
 import sys
+import json
+import builtins
+import argparse
 import socket
 import webbrowser
 import time
 import threading
 import subprocess
+import multiprocessing
+import urllib.error
+import urllib.request
 from pathlib import Path
 
 
@@ -37,27 +43,142 @@ def wait_for_server(host, port, timeout=30):
     return False
 
 
+def wait_for_ready(url, poll_interval=1.0):
+    """Wait until the server reports its data loaded, printing load progress meanwhile
+    
+    The server binds before loading, so there's no time limit: first runs
+    take as long as ingesting the source files takes. Returns False if the
+    load failed.
+    """
+    last_progress = None
+    while True:
+        try:
+            with urllib.request.urlopen(f"{url}/api/ready", timeout=5):
+                return True
+        except urllib.error.HTTPError as e:
+            if e.code != 503:
+                return False
+            try:
+                status = json.load(e)
+            except ValueError:
+                status = {}
+            if status.get("state") == "failed":
+                print(f"Loading data failed: {status.get('error')}")
+                return False
+            
+            progress = f"{status.get('tables_done', 0)}/{status.get('tables_total', 0)}"
+            if status.get("tables_total") and progress != last_progress:
+                print(f"Loading data: {progress} tables done")
+                last_progress = progress
+            retry_after = e.headers.get("Retry-After")
+            time.sleep(min(float(retry_after), poll_interval) if retry_after else poll_interval)
+        except (urllib.error.URLError, OSError):
+            # Not listening yet
+            time.sleep(0.5)
+
+
 def open_browser(url):
-    """Open browser after a short delay"""
-    time.sleep(2)
-    webbrowser.open(url)
+    """Open browser once the server's data is ready"""
+    if wait_for_ready(url):
+        webbrowser.open(url)
+
+
+class ImportTimer:
+    """Time first imports the way `python -X importtime` does, for any interpreter
+    
+    Hooks `builtins.__import__` rather than relying on the interpreter
+    option, which can't be passed to the frozen executable. Relative
+    imports are counted towards the module doing them.
+    """
+    
+    def __init__(self):
+        self.records = []  # (module, self seconds, cumulative seconds, depth) in completion order
+        self._children = []
+        self._original_import = None
+    
+    def __enter__(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+        return self
+    
+    def __exit__(self, *exc_info):
+        builtins.__import__ = self._original_import
+    
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        
+        self._children.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - started
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += cumulative
+            self.records.append((name, cumulative - children, cumulative, len(self._children)))
+
+
+def report_import_times(backend_dir, limit=30):
+    """Print how long importing the backend takes and the slowest modules it pulls in"""
+    os.chdir(backend_dir)
+    sys.path.insert(0, str(backend_dir))
+    
+    started = time.perf_counter()
+    with ImportTimer() as timer:
+        import main  # noqa: F401
+    total = time.perf_counter() - started
+    
+    print(f"Backend import time: {total * 1000:.0f} ms ({len(timer.records)} modules)")
+    print(f"\nSlowest {limit} imports (microseconds, as `python -X importtime`):")
+    print("import time: self [us] | cumulative | imported package")
+    slowest = sorted(timer.records, key=lambda record: record[2], reverse=True)[:limit]
+    for name, self_time, cumulative, depth in slowest:
+        print(f"import time: {self_time * 1e6:9.0f} | {cumulative * 1e6:10.0f} | {'  ' * depth}{name}")
+
+
+def get_app_dir():
+    """Directory holding the backend and bundled data, inside the executable when frozen"""
+    if getattr(sys, 'frozen', False):
+        return Path(sys._MEIPASS)
+    return Path(__file__).parent
+
+
+def parse_args():
+    """Command line options"""
+    parser = argparse.ArgumentParser(description="Start the Project RawHorse server")
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="number of server processes (default: server.workers in config.yaml, or 1)"
+    )
+    parser.add_argument(
+        "--import-times", action="store_true",
+        help="print how long the backend takes to import, by module, and exit"
+    )
+    return parser.parse_args()
 
 
 def main():
     """Main startup function"""
+    args = parse_args()
+    
+    if args.import_times:
+        report_import_times(get_app_dir() / "backend")
+        return
+    
     print("=" * 60)
     print("Project RawHorse")
     print("Starting application...")
     print("=" * 60)
     
     # Get the directory where the executable is located
+    app_dir = get_app_dir()
     if getattr(sys, 'frozen', False):
         # Running as compiled executable
-        app_dir = Path(sys._MEIPASS)
         data_dir = Path(sys.executable).parent / "data"
     else:
         # Running as script
-        app_dir = Path(__file__).parent
         data_dir = app_dir / "data"
     
     # Ensure data directory exists
@@ -79,24 +200,33 @@ def main():
     # Change to backend directory
     backend_dir = app_dir / "backend"
     os.chdir(backend_dir)
+    sys.path.insert(0, str(backend_dir))
     
     # Set environment variables
     os.environ['UAP_DATA_DIR'] = str(data_dir)
     os.environ['UAP_PORT'] = str(port)
     
-    print("\nInitializing database and loading data...")
-    print("This may take a few moments on first run...")
+    print("\nInitializing database and loading data in the background...")
+    print("The browser opens once the data is ready, which may take a few moments on first run...")
     print("\nPress Ctrl+C to stop the server\n")
     
     # Start uvicorn server
-    import uvicorn
-    from main import app
+    from main import PROJECT_ROOT, config, get_db_path, run_server
+    from snapshot import install_snapshot
+    
+    # Fresh installs start from the prebuilt database instead of loading the CSVs
+    if install_snapshot(str(app_dir / "snapshot"), get_db_path(), config, PROJECT_ROOT):
+        print("Installed prebuilt database")
+    
+    workers = args.workers or config['server'].get('workers') or 1
+    if workers > 1:
+        print(f"Serving with {workers} worker processes")
     
     try:
-        uvicorn.run(
-            app,
-            host=host,
-            port=port,
+        run_server(
+            host,
+            port,
+            workers=workers,
             log_level="info",
             access_log=False
         )
@@ -111,4 +241,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Required for the data loader's worker processes in the frozen executable
+    multiprocessing.freeze_support()
     main()